@@ -0,0 +1,138 @@
+"""The sample apps driven by benchmarks/e2e.py."""
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+import humps
+from pydantic import BaseModel, Field
+
+from schema_validator import DataSource, SchemaValidator
+
+# mode -> SchemaValidator arguments
+MODES = {
+    "json": {},
+    "casing": {"convert_casing": True},
+    "no_response_validation": {"response_validation_rate": 0.0},
+    "form": {},
+    "tag_docs": {},
+}
+
+
+class Status(Enum):
+    NEW = "new"
+    PAID = "paid"
+    SHIPPED = "shipped"
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+    postal_code: str = Field(..., max_length=10)
+    country: str = Field(..., min_length=2, max_length=2)
+
+
+class Line(BaseModel):
+    sku: str
+    quantity: int = Field(..., gt=0)
+    unit_price: float = Field(..., ge=0)
+
+
+class Order(BaseModel):
+    customer_id: int
+    status: Status = Status.NEW
+    shipping_address: Address
+    lines: List[Line]
+    note: Optional[str] = None
+
+
+class OrderResponse(Order):
+    order_id: int
+    created_at: datetime
+    total: float
+
+
+class OrderQuery(BaseModel):
+    limit: int = Field(20, le=100)
+    status: Optional[Status] = None
+
+
+class Login(BaseModel):
+    username: str
+    password: str
+
+
+class Token(BaseModel):
+    token: str
+
+
+def order_body(casing: bool = False) -> dict:
+    line = {"sku": "SKU-1", "quantity": 2, "unit_price": 9.5}
+    body = {
+        "customer_id": 42,
+        "status": "paid",
+        "shipping_address": {
+            "street": "1 Main St", "city": "Springfield",
+            "postal_code": "12345", "country": "US",
+        },
+        "lines": [line] * 10,
+    }
+    if casing:
+        body = humps.camelize(body)
+    return body
+
+
+def _order_response(order: Order) -> OrderResponse:
+    return OrderResponse(
+        **order.dict(), order_id=1, created_at=datetime(2021, 1, 1),
+        total=sum(line.quantity * line.unit_price for line in order.lines)
+    )
+
+
+def create_flask_app(mode: str):
+    from flask import Flask, g
+    from schema_validator.flask import validate
+
+    app = Flask(__name__)
+    app.config["SWAGGER_ROUTE"] = True
+    SchemaValidator(app, **MODES[mode])
+
+    @app.post("/orders")
+    @validate(
+        body=Order, query_string=OrderQuery,
+        responses={200: OrderResponse}, tags=["orders"]
+    )
+    def create_order():
+        return _order_response(g.body_params)
+
+    @app.post("/login")
+    @validate(body=Login, source=DataSource.FORM, responses=Token,
+              tags=["auth"])
+    def login():
+        return Token(token=g.body_params.username)
+
+    return app
+
+
+def create_quart_app(mode: str):
+    from quart import Quart, g
+    from schema_validator.quart import validate
+
+    app = Quart(__name__)
+    app.config["SWAGGER_ROUTE"] = True
+    SchemaValidator(app, **MODES[mode])
+
+    @app.post("/orders")
+    @validate(
+        body=Order, query_string=OrderQuery,
+        responses={200: OrderResponse}, tags=["orders"]
+    )
+    async def create_order():
+        return _order_response(g.body_params)
+
+    @app.post("/login")
+    @validate(body=Login, source=DataSource.FORM, responses=Token,
+              tags=["auth"])
+    async def login():
+        return Token(token=g.body_params.username)
+
+    return app
@@ -0,0 +1,289 @@
+"""Micro-benchmarks of the validation and serialization hot paths.
+
+    python -m benchmarks.bench run -o benchmarks/baseline.json
+    python -m benchmarks.bench compare benchmarks/baseline.json -t 0.1
+
+The views are called directly in a pushed flask request context, so the
+numbers are the cost of validate and of the view, without the WSGI
+stack, and each number is the median of repeat runs. compare exits with
+1 when a benchmark is slower than the baseline by more than the
+threshold, which needs a quiet machine to hold.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import humps
+from flask import Flask, Response
+from pydantic import BaseModel
+
+from schema_validator import DataSource, SchemaValidator
+from schema_validator.core import _build_openapi_schema
+from schema_validator.flask import validate
+
+
+class Tag(BaseModel):
+    name: str
+    weight: float
+
+
+class Item(BaseModel):
+    item_id: int
+    name: str
+    price: float
+    tags: List[Tag] = []
+
+
+class Items(BaseModel):
+    items: List[Item]
+
+
+@dataclass
+class DCTag:
+    name: str
+    weight: float
+
+
+@dataclass
+class DCItem:
+    item_id: int
+    name: str
+    price: float
+    tags: List[DCTag]
+
+
+class Form(BaseModel):
+    name: str
+    count: int
+
+
+def _item(index: int) -> dict:
+    return {
+        "item_id": index, "name": f"item {index}", "price": 1.5,
+        "tags": [{"name": "a", "weight": 0.5}, {"name": "b", "weight": 1}],
+    }
+
+
+ITEM = _item(1)
+BODIES = {
+    "small": ITEM,
+    "medium": {"items": [_item(i) for i in range(100)]},
+    "huge": {"items": [_item(i) for i in range(10000)]},
+}
+
+
+Setup = Callable[[], Tuple[Any, Callable]]
+
+
+def _view_benchmark(
+    view: Callable,
+    convert_casing: bool = False,
+    **request_kwargs
+) -> Setup:
+    """The benchmark of the view decorated by validate, called in a
+    request context with the request_kwargs.
+    """
+    def setup() -> Tuple[Any, Callable]:
+        app = Flask(__name__)
+        SchemaValidator(app, convert_casing=convert_casing)
+        app.add_url_rule("/", view.__name__, view, methods=["POST"])
+        context = app.test_request_context(
+            "/", method="POST", **request_kwargs)
+        return context, view
+    return setup
+
+
+@validate()
+def no_models():
+    return ""
+
+
+@validate(body=Item)
+def small_body():
+    return ""
+
+
+@validate(body=Items)
+def items_body():
+    return ""
+
+
+@validate(body=DCItem)
+def dataclass_body():
+    return ""
+
+
+@validate(body=Form, source=DataSource.FORM)
+def form_body():
+    return ""
+
+
+@validate(responses=Item)
+def dict_response():
+    return ITEM
+
+
+MODEL = Item(**ITEM)
+
+
+@validate(responses=Item)
+def model_response():
+    return MODEL
+
+
+DC_ITEM = DCItem(
+    item_id=1, name="item 1", price=1.5,
+    tags=[DCTag(name="a", weight=0.5), DCTag(name="b", weight=1)]
+)
+
+
+@validate(responses=Item)
+def dataclass_response():
+    return DC_ITEM
+
+
+RESPONSE_DATA = json.dumps(ITEM)
+
+
+@validate(responses=Item)
+def response_response():
+    return Response(RESPONSE_DATA, mimetype="application/json")
+
+
+@validate(body=Item, responses=Item)
+def echo():
+    return ITEM
+
+
+def _openapi_benchmark(routes: int) -> Setup:
+    def setup() -> Tuple[Any, Callable]:
+        app = Flask(__name__)
+        extension = SchemaValidator(app)
+        for index in range(routes):
+            @validate(body=Item, responses={200: Item, 400: Tag},
+                      tags=[f"tag{index % 10}"])
+            def view():
+                return ""
+            app.add_url_rule(
+                f"/items/{index}/<int:item_id>", f"view{index}", view,
+                methods=["POST"]
+            )
+        return (
+            app.app_context(), lambda: _build_openapi_schema(app, extension)
+        )
+    return setup
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "validate_no_models": _view_benchmark(no_models),
+    "body_small": _view_benchmark(small_body, json=BODIES["small"]),
+    "body_medium": _view_benchmark(items_body, json=BODIES["medium"]),
+    "body_huge": _view_benchmark(items_body, json=BODIES["huge"]),
+    "body_dataclass": _view_benchmark(dataclass_body, json=ITEM),
+    "body_form": _view_benchmark(
+        form_body, data={"name": "a", "count": "1"}),
+    "response_dict": _view_benchmark(dict_response),
+    "response_model": _view_benchmark(model_response),
+    "response_dataclass": _view_benchmark(dataclass_response),
+    "response_response": _view_benchmark(response_response),
+    "casing_off": _view_benchmark(echo, json=ITEM),
+    "casing_on": _view_benchmark(
+        echo, convert_casing=True, json=humps.camelize(ITEM)),
+    "openapi_10_routes": _openapi_benchmark(10),
+    "openapi_100_routes": _openapi_benchmark(100),
+    "openapi_1000_routes": _openapi_benchmark(1000),
+}
+
+
+def measure(setup: Setup, repeat: int) -> float:
+    """The median time in seconds of one call, after a first call which
+    prepares the view.
+    """
+    context, func = setup()
+    with context:
+        func()
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        return statistics.median(timer.repeat(repeat, number)) / number
+
+
+def run(
+    names: Optional[List[str]] = None,
+    repeat: int = 15,
+    verbose: bool = True
+) -> dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = measure(setup, repeat)
+        if verbose:
+            print(f"{name:24} {results[name] * 1e6:12.1f} us")
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """The names of the benchmarks slower than the baseline by more than
+    the threshold.
+    """
+    regressions = []
+    for name, seconds in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:24} {seconds * 1e6:12.1f} us        new")
+            continue
+        change = seconds / base - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        print(f"{name:24} {seconds * 1e6:12.1f} us {change:+8.1%} {flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="write the results")
+    compare_parser = commands.add_parser(
+        "compare", help="run the benchmarks and compare to a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument(
+        "-t", "--threshold", type=float, default=0.1,
+        help="the slowdown flagged as a regression, 0.1 for 10%%")
+    for command in (run_parser, compare_parser):
+        command.add_argument("-r", "--repeat", type=int, default=15)
+        command.add_argument(
+            "-b", "--benchmark", action="append", dest="names",
+            choices=sorted(BENCHMARKS), help="only run these benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.names, args.repeat)
+        if args.output:
+            with open(args.output, "w") as file_:
+                json.dump(results, file_, indent=2)
+        return 0
+
+    with open(args.baseline) as file_:
+        baseline = json.load(file_)
+    regressions = compare(
+        baseline, run(args.names, args.repeat, False), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
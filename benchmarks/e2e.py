@@ -0,0 +1,264 @@
+"""End-to-end throughput and tail latency of the sample apps.
+
+    python -m benchmarks.e2e -d 10 -c 16
+    python -m benchmarks.e2e -d 10 -c 64 -r 500
+    python -m benchmarks.e2e -f quart -m json -m casing -o results.json
+
+Each app runs in its own process on localhost, flask under the threaded
+werkzeug WSGI server and quart under hypercorn, and is driven by
+concurrency keep-alive connections for duration seconds after a warmup.
+
+By default each connection sends its next request when the previous one
+completes, a closed loop whose latencies omit the requests a stalled
+server delays. With a rate the requests are sent on a fixed schedule
+of rate per second and their latencies are measured from their
+scheduled time, concurrency is then the most requests in flight.
+"""
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.client import HTTPConnection
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from benchmarks.apps import MODES, order_body
+
+FRAMEWORKS = ("flask", "quart")
+
+
+def serve(framework: str, mode: str, port: int) -> None:
+    if framework == "flask":
+        import logging
+        from werkzeug.serving import make_server
+        from benchmarks.apps import create_flask_app
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        make_server(
+            "127.0.0.1", port, create_flask_app(mode), threaded=True
+        ).serve_forever()
+    else:
+        import asyncio
+        from hypercorn.asyncio import serve as hypercorn_serve
+        from hypercorn.config import Config
+        from benchmarks.apps import create_quart_app
+
+        config = Config()
+        config.bind = [f"127.0.0.1:{port}"]
+        config.accesslog = None
+        asyncio.run(hypercorn_serve(create_quart_app(mode), config))
+
+
+def request_for(mode: str) -> Tuple[str, str, bytes, Dict[str, str]]:
+    """The method, path, body and headers of the requests of the mode."""
+    if mode == "form":
+        body = urlencode({"username": "bob", "password": "secret"})
+        return "POST", "/login", body.encode(), {
+            "Content-Type": "application/x-www-form-urlencoded"}
+    if mode == "tag_docs":
+        return "GET", "/swagger/openapi-orders.json", b"", {}
+    body = json.dumps(order_body(casing=mode == "casing")).encode()
+    return "POST", "/orders?limit=10", body, {
+        "Content-Type": "application/json"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"the server on port {port} did not start")
+
+
+class Schedule:
+    """The send times of requests arriving at a fixed rate, shared by the
+    workers, each request is taken by the next idle worker.
+    """
+
+    def __init__(self, rate: float, start: float) -> None:
+        self.rate = rate
+        self.start = start
+        self._sent = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> float:
+        with self._lock:
+            index = self._sent
+            self._sent += 1
+        return self.start + index / self.rate
+
+
+def _worker(
+    port: int,
+    request: Tuple[str, str, bytes, Dict[str, str]],
+    until: float,
+    schedule: Optional[Schedule],
+    latencies: List[float],
+    errors: List[int]
+) -> None:
+    method, path, body, headers = request
+    connection = HTTPConnection("127.0.0.1", port)
+    while True:
+        if schedule is None:
+            start = time.perf_counter()
+        else:
+            # a late request keeps its scheduled time, the time it
+            # waited for an idle worker is part of its latency
+            start = schedule.next()
+            delay = start - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if start >= until:
+            break
+        try:
+            connection.request(method, path, body or None, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, ValueError):
+            errors.append(0)
+            connection.close()
+            connection = HTTPConnection("127.0.0.1", port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def load(
+    port: int,
+    request: Tuple[str, str, bytes, Dict[str, str]],
+    duration: float,
+    concurrency: int,
+    rate: Optional[float] = None
+) -> Tuple[List[float], List[int]]:
+    """The latencies of the requests sent by concurrency threads for
+    duration seconds, at rate requests per second if given, and the
+    status codes of the failures.
+    """
+    latencies: List[float] = []
+    errors: List[int] = []
+    start = time.perf_counter()
+    until = start + duration
+    schedule = Schedule(rate, start) if rate else None
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(port, request, until, schedule, latencies, errors)
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(
+    framework: str,
+    mode: str,
+    duration: float,
+    concurrency: int,
+    warmup: float,
+    rate: Optional[float] = None
+) -> dict:
+    port = _free_port()
+    server = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.e2e", "serve",
+        framework, mode, str(port)
+    ])
+    try:
+        _wait_for(port)
+        request = request_for(mode)
+        if warmup:
+            load(port, request, warmup, concurrency, rate)
+        # the requests of an overloaded schedule complete after duration
+        started = time.perf_counter()
+        latencies, errors = load(
+            port, request, duration, concurrency, rate)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    return {
+        "framework": framework,
+        "mode": mode,
+        "rate": rate,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "p999": percentile(latencies, 0.999),
+    }
+
+
+def report(result: dict) -> None:
+    print(
+        f"{result['framework']:6} {result['mode']:24} "
+        f"{result['rps']:9.0f} rps  "
+        f"p50 {result['p50'] * 1000:7.2f} ms  "
+        f"p99 {result['p99'] * 1000:7.2f} ms  "
+        f"p999 {result['p999'] * 1000:7.2f} ms  "
+        f"errors {result['errors']}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        serve(argv[1], argv[2], int(argv[3]))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-f", "--framework", action="append", choices=FRAMEWORKS)
+    parser.add_argument(
+        "-m", "--mode", action="append", choices=sorted(MODES))
+    parser.add_argument("-d", "--duration", type=float, default=10.0)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-w", "--warmup", type=float, default=2.0)
+    parser.add_argument(
+        "-r", "--rate", type=float,
+        help="send requests at this rate per second instead of in a "
+             "closed loop")
+    parser.add_argument("-o", "--output", help="write the results")
+    args = parser.parse_args(argv)
+
+    results = []
+    for framework in args.framework or FRAMEWORKS:
+        for mode in args.mode or MODES:
+            result = run(
+                framework, mode, args.duration, args.concurrency,
+                args.warmup, args.rate
+            )
+            report(result)
+            results.append(result)
+    if args.output:
+        with open(args.output, "w") as file_:
+            json.dump(results, file_, indent=2)
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,27 @@
-from .core import SchemaValidator
-from .utils import tags, DataSource
-from .command import generate_schema_command
+from importlib import import_module
+from typing import Any
+
+# the modules are imported on first access, so that importing
+# schema_validator.flask or schema_validator.quart does not import the
+# openapi generation, the other framework or click
+_LAZY = {
+    "SchemaValidator": "core",
+    "tags": "utils",
+    "DataSource": "utils",
+    "generate_schema_command": "command",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,113 @@
+import weakref
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict
+
+from pydantic import BaseModel
+
+from schema_validator.types import PydanticModel
+
+CASING_CACHE_SIZE = 4096
+
+# field name <-> camel case alias of the models registered by validate,
+# only the names that humps converts both ways so that the aliases agree
+# with humps whichever model registered them
+_camel_aliases: Dict[str, str] = {}
+_snake_aliases: Dict[str, str] = {}
+_registered_models: "weakref.WeakSet" = weakref.WeakSet()
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=CASING_CACHE_SIZE)
+def _camelize_key(key: str) -> str:
+    import humps
+    return humps.camelize(key)
+
+
+@lru_cache(maxsize=CASING_CACHE_SIZE)
+def _decamelize_key(key: str) -> str:
+    import humps
+    return humps.decamelize(key)
+
+
+def camelize_key(key: Any) -> Any:
+    if type(key) is not str:
+        return key
+    alias = _camel_aliases.get(key)
+    if alias is None:
+        alias = _camelize_key(key)
+    return alias
+
+
+def decamelize_key(key: Any) -> Any:
+    if type(key) is not str:
+        return key
+    alias = _snake_aliases.get(key)
+    if alias is None:
+        alias = _decamelize_key(key)
+    return alias
+
+
+def _convert(object_: Any, convert_key) -> Any:
+    if isinstance(object_, _SCALARS):
+        return object_
+    if isinstance(object_, Mapping):
+        return {
+            convert_key(key): _convert(value, convert_key)
+            for key, value in object_.items()
+        }
+    if isinstance(object_, (list, tuple)):
+        return [_convert(value, convert_key) for value in object_]
+    return object_
+
+
+def camelize(object_: Any) -> Any:
+    """Camelize the keys of the mappings in one pass."""
+    return _convert(object_, camelize_key)
+
+
+def decamelize(object_: Any) -> Any:
+    """Decamelize the keys of the mappings in one pass."""
+    return _convert(object_, decamelize_key)
+
+
+def decamelize_keys(object_: dict) -> dict:
+    """Decamelize the keys of the mapping but not of the nested values."""
+    return {decamelize_key(key): value for key, value in object_.items()}
+
+
+def register_model(model: PydanticModel) -> None:
+    """Precompute the casing of the fields of the model and its
+    nested models.
+    """
+    fields = getattr(model, "__fields__", None)
+    if fields is None:
+        model = getattr(model, "__pydantic_model__", None)
+        fields = getattr(model, "__fields__", None)
+    if not fields or model in _registered_models:
+        return
+
+    import humps
+
+    _registered_models.add(model)
+    for name, field in fields.items():
+        if name not in _camel_aliases:
+            alias = humps.camelize(name)
+            if alias != name and humps.decamelize(alias) == name:
+                _camel_aliases[name] = alias
+                _snake_aliases[alias] = name
+        type_ = field.type_
+        if isinstance(type_, type) and (
+            issubclass(type_, BaseModel) or
+            hasattr(type_, "__pydantic_model__")
+        ):
+            register_model(type_)
+
+
+def cache_info() -> Dict[str, Any]:
+    return {
+        "aliases": len(_camel_aliases),
+        "camelize": _camelize_key.cache_info(),
+        "decamelize": _decamelize_key.cache_info(),
+    }
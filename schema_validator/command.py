@@ -1,9 +1,14 @@
+import hashlib
 import json
+import os
+import re
+import time
 
 import click
 
-from schema_validator.types import Optional
-from schema_validator.core import _build_openapi_schema
+from schema_validator.types import Dict, Optional
+from schema_validator.core import _build_openapi_schema, \
+    _build_openapi_schemas
 
 try:
     from flask import current_app as app
@@ -28,16 +33,40 @@ except ImportError:
     default="",
     help="Export swagger include tag"
 )
+@click.option(
+    "--all-tags",
+    is_flag=True,
+    default=False,
+    help="Export the full spec and the spec of each tag to --output-dir."
+)
+@click.option(
+    "--output-dir",
+    "-d",
+    type=click.Path(file_okay=False),
+    help="Output the specs of --all-tags to this directory."
+)
 @with_appcontext
 def generate_schema_command(
     output: Optional[str],
-    tag: Optional[str]
+    tag: Optional[str],
+    all_tags: bool,
+    output_dir: Optional[str]
 ) -> None:
     """
     The command which can dump json-swagger
         app.cli.add_command(generate_schema_command)
     virtualenv: flask schema
+    virtualenv: flask schema --all-tags --output-dir specs
     """
+    if all_tags:
+        if output_dir is None:
+            raise click.UsageError("--all-tags requires --output-dir.")
+        if output is not None or tag:
+            raise click.UsageError(
+                "--all-tags cannot be used with --output or --tag.")
+        _export_all_tags(output_dir)
+        return
+
     schema = _build_openapi_schema(
         app, app.extensions["SCHEMA_VALIDATOR"], tag if tag else None)
 
@@ -47,3 +76,72 @@ def generate_schema_command(
             click.echo(formatted_spec, file=file_)
     else:
         click.echo(formatted_spec)
+
+
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+def _spec_file_name(tag: Optional[str]) -> str:
+    """The file of the spec of the tag, the tags with characters unsafe
+    in file names get a hash suffix, so that "a/b" and "a b" do not
+    overwrite "a_b".
+    """
+    if tag is None:
+        return "openapi.json"
+    name = _UNSAFE.sub("_", tag)
+    if name != tag:
+        digest = hashlib.sha256(tag.encode()).hexdigest()[:8]
+        name = f"{name}-{digest}"
+    return f"openapi-{name}.json"
+
+
+def _file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as file_:
+            return hashlib.sha256(file_.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _export_all_tags(output_dir: str) -> None:
+    """Write the full spec and the spec of each tag built from one walk
+    of the views, the files whose content is unchanged are not rewritten.
+    """
+    start = time.perf_counter()
+    schemas = _build_openapi_schemas(app, app.extensions["SCHEMA_VALIDATOR"])
+    walked = time.perf_counter()
+
+    contents: Dict[str, bytes] = {}
+    names: Dict[str, Optional[str]] = {}
+    for tag in sorted(schemas, key=lambda tag: (tag is not None, tag)):
+        name = _spec_file_name(tag)
+        # case insensitive file systems
+        if name.lower() in names:
+            raise click.ClickException(
+                f"the tags {names[name.lower()]!r} and {tag!r} are both "
+                f"exported to {name}"
+            )
+        names[name.lower()] = tag
+        spec = json.dumps(schemas[tag], indent=2, ensure_ascii=False)
+        contents[name] = f"{spec}\n".encode()
+    serialized = time.perf_counter()
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = unchanged = 0
+    for name, content in contents.items():
+        path = os.path.join(output_dir, name)
+        if _file_hash(path) == hashlib.sha256(content).hexdigest():
+            unchanged += 1
+            continue
+        with open(path, "wb") as file_:
+            file_.write(content)
+        written += 1
+    done = time.perf_counter()
+
+    click.echo(f"walk       {(walked - start) * 1000:9.1f} ms")
+    click.echo(f"serialize  {(serialized - walked) * 1000:9.1f} ms")
+    click.echo(f"write      {(done - serialized) * 1000:9.1f} ms")
+    click.echo(
+        f"{len(contents)} specs in {output_dir}: {written} written, "
+        f"{unchanged} unchanged"
+    )
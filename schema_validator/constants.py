@@ -2,6 +2,9 @@ SCHEMA_REQUEST_ATTRIBUTE = "_schema_request_schema"
 SCHEMA_RESPONSE_ATTRIBUTE = "_schema_response_schemas"
 SCHEMA_QUERYSTRING_ATTRIBUTE = "_schema_querystring_schema"
 SCHEMA_TAG_ATTRIBUTE = "_schema_tag_schemas"
+SCHEMA_HEADERS_ATTRIBUTE = "_schema_headers_schema"
+SCHEMA_PATH_ATTRIBUTE = "_schema_path_schema"
+SCHEMA_PREPARATION_ATTRIBUTE = "_schema_preparation"
 REF_PREFIX = "#/components/schemas/"
 IGNORE_METHODS = {"OPTIONS", "HEAD"}
 
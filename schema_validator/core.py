@@ -1,19 +1,36 @@
+import gc
+import hmac
 import re
 import logging
+import weakref
 from collections.abc import Mapping
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Executor
+from hashlib import sha1
+from uuid import UUID
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+)
 
-from humps import camelize, decamelize
 from pydantic.json import pydantic_encoder
 from pydantic.schema import model_schema
 
+from schema_validator.casing import camelize, decamelize_keys
 from schema_validator.constants import (
-    IGNORE_METHODS, REF_PREFIX, SCHEMA_QUERYSTRING_ATTRIBUTE,
-    SCHEMA_REQUEST_ATTRIBUTE, SCHEMA_RESPONSE_ATTRIBUTE, SCHEMA_TAG_ATTRIBUTE,
-    SWAGGER_CSS_URL, SWAGGER_JS_URL
+    IGNORE_METHODS, REF_PREFIX, SCHEMA_HEADERS_ATTRIBUTE,
+    SCHEMA_PATH_ATTRIBUTE, SCHEMA_PREPARATION_ATTRIBUTE,
+    SCHEMA_QUERYSTRING_ATTRIBUTE, SCHEMA_REQUEST_ATTRIBUTE,
+    SCHEMA_RESPONSE_ATTRIBUTE, SCHEMA_TAG_ATTRIBUTE, SWAGGER_CSS_URL,
+    SWAGGER_JS_URL
 )
-from schema_validator.types import ServerObject
-from schema_validator.utils import DataSource
+from schema_validator.executor import ObservedExecutor, observe
+from schema_validator.json_backend import CasingJSONBackend, JSONBackend, \
+    default_json_backend
+from schema_validator.metrics import Metrics, Timings
+from schema_validator.preparation import prepare_view
+from schema_validator.profiling import Profiler
+from schema_validator.types import PydanticModel, ServerObject
+from schema_validator.utils import DataSource, ListBody, \
+    check_validation_rate, converter_type, header_name, render_errors
 
 
 try:
@@ -26,7 +43,18 @@ except ImportError:
     IS_FLASK = True
 
 
+# the endpoints added by SchemaValidator, and the static files
+INTERNAL_ENDPOINTS = (
+    "static", "openapi", "swagger_ui", "swagger_ui_tag", "openapi_tag",
+    "schema_metrics"
+)
 PATH_RE = re.compile("<(?:[^:]*:)?([^>]+)>")
+PATH_SCHEMAS = {
+    int: {"type": "integer"},
+    float: {"type": "number"},
+    UUID: {"type": "string", "format": "uuid"},
+    str: {"type": "string"},
+}
 logger = logging.getLogger(__name__)
 
 
@@ -39,7 +67,7 @@ class CasingJSONEncoder(PydanticJSONEncoder):
     def encode(self, object_: Any) -> Any:
         if isinstance(object_, (list, Mapping)):
             object_ = camelize(object_)
-        return super().encode(camelize(object_))
+        return super().encode(object_)
 
 
 class CasingJSONDecoder(JSONDecoder):
@@ -48,7 +76,8 @@ class CasingJSONDecoder(JSONDecoder):
 
     @staticmethod
     def object_hook(object_: dict) -> Any:
-        return decamelize(object_)
+        # the nested objects are already decoded and converted
+        return decamelize_keys(object_)
 
 
 class SchemaValidator:
@@ -68,6 +97,67 @@ class SchemaValidator:
             swagger or None to disable swagger documentation.
         title: The publishable title for the app.
         version: The publishable version for the app.
+        response_validation_rate: The fraction of responses validated
+            against their response models, the others are serialized
+            without validation.
+        response_validation_error_handler: Called with the endpoint and
+            the error when a response fails validation, the response is
+            then served unvalidated instead of a 400.
+        max_body_errors: The number of invalid items after which the
+            validation of a List[Item] body stops, and of the invalid
+            items of streamed bodies whose errors are kept, None for no
+            limit.
+        max_validation_errors: The number of errors rendered for each
+            invalid location, including the marker of the omitted
+            errors, None to render all.
+        error_renderer: Called with a dict of location (body_params,
+            query_params, response...) -> list of errors as returned by
+            ValidationError.errors(), returns the body of the 400.
+        max_body_size: The maximum size in bytes of request bodies,
+            larger bodies are rejected with a 413, on their
+            Content-Length or as they are read.
+        max_body_depth, max_array_length, max_object_keys: The maximum
+            nesting depth, array length and keys per object of json
+            bodies, checked on the parsed json before the model is
+            built.
+        max_stream_item_size: The maximum size in bytes of a line or of
+            an item of NDJSON and JSON_STREAM bodies, None for no limit.
+        json_backend: The JSONBackend used to parse validated requests
+            and to encode validated responses and validation errors,
+            orjson is used if it is installed.
+        offload_threshold: Under quart, json bodies and json responses
+            of at least so many bytes are parsed and validated in the
+            offload executor instead of on the event loop.
+        offload_item_threshold: Under quart, the dicts, models and
+            dataclasses returned by the views with at least so many
+            fields and items, nested ones included, are validated in the
+            offload executor.
+        offload_executor: The concurrent.futures executor used, a thread
+            pool of offload_workers threads by default, which is shut
+            down after serving. The models and the values must be
+            picklable to use a process pool, the item models created
+            for List[Item] bodies are not, so such bodies cannot be
+            offloaded to one.
+        view_executor: Under quart, sync views decorated with validate
+            run in this executor, or thread pool of so many workers,
+            instead of the default executor of quart.
+        tag_view_executors: tag -> executor or number of workers, used
+            for the sync views with the tag.
+        view_max_queue: The number of calls which may wait for a worker
+            of a view executor before requests are rejected with a 503.
+        metrics: Record histograms of the duration of the parse, validate,
+            view, response_validate and serialize phases of each endpoint
+            in self.metrics.
+        metrics_path: The path serving the histograms in the prometheus
+            text format if metrics is enabled, None to not serve them.
+        metrics_buckets: The bounds in seconds of the histogram buckets.
+        server_timing: Add a Server-Timing header with the phase
+            durations and the payload sizes to the responses of validate.
+        server_timing_token: Add the Server-Timing header only to the
+            requests whose server_timing_header is this token.
+        server_timing_header: The request header enabling Server-Timing.
+        profiler: The Profiler capturing the profiles of sampled and slow
+            requests through validate.
     """
 
     def __init__(
@@ -78,7 +168,34 @@ class SchemaValidator:
         title: Optional[str] = None,
         version: str = "0.1.0",
         convert_casing: bool = False,
-        servers: Optional[List[ServerObject]] = None
+        servers: Optional[List[ServerObject]] = None,
+        response_validation_rate: float = 1.0,
+        response_validation_error_handler: Optional[
+            Callable[[str, Exception], Any]] = None,
+        max_body_errors: Optional[int] = 20,
+        max_validation_errors: Optional[int] = 10,
+        error_renderer: Optional[Callable[[dict], Any]] = None,
+        max_body_size: Optional[int] = None,
+        max_body_depth: Optional[int] = None,
+        max_array_length: Optional[int] = None,
+        max_object_keys: Optional[int] = None,
+        max_stream_item_size: Optional[int] = 1024 * 1024,
+        json_backend: Optional[JSONBackend] = None,
+        offload_threshold: Optional[int] = None,
+        offload_item_threshold: Optional[int] = None,
+        offload_executor: Optional[Executor] = None,
+        offload_workers: Optional[int] = None,
+        view_executor: Union[None, int, Executor] = None,
+        tag_view_executors: Optional[
+            Dict[str, Union[int, Executor]]] = None,
+        view_max_queue: Optional[int] = None,
+        metrics: bool = False,
+        metrics_path: Optional[str] = "/metrics",
+        metrics_buckets: Optional[Iterable[float]] = None,
+        server_timing: bool = False,
+        server_timing_token: Optional[str] = None,
+        server_timing_header: str = "X-Server-Timing",
+        profiler: Optional[Profiler] = None
     ) -> None:
         self.openapi_path = "/swagger/openapi.json"
         self.openapi_tag_path = "/swagger/openapi-<tag>.json"
@@ -87,6 +204,44 @@ class SchemaValidator:
         self.version = version
         self.convert_casing = convert_casing
         self.servers = servers or []
+        self.response_validation_rate = check_validation_rate(
+            response_validation_rate)
+        self.response_validation_error_handler = \
+            response_validation_error_handler
+        self.max_body_errors = max_body_errors
+        self.max_validation_errors = max_validation_errors
+        self.error_renderer = error_renderer or render_errors
+        self.max_body_size = max_body_size
+        self.max_body_depth = max_body_depth
+        self.max_array_length = max_array_length
+        self.max_object_keys = max_object_keys
+        self.max_stream_item_size = max_stream_item_size
+        self.json_backend = json_backend or default_json_backend()
+        if convert_casing:
+            self.json_backend = CasingJSONBackend(self.json_backend)
+        self.offload_threshold = offload_threshold
+        self.offload_item_threshold = offload_item_threshold
+        self.offload_workers = offload_workers
+        self._offload_executor = offload_executor
+        self._observed_offload_executor: Optional[ObservedExecutor] = None
+        self.view_max_queue = view_max_queue
+        self.view_executor: Optional[ObservedExecutor] = None
+        if view_executor is not None:
+            self.view_executor = observe(view_executor, view_max_queue)
+        self.tag_view_executors: Dict[str, ObservedExecutor] = {
+            tag: observe(executor, view_max_queue)
+            for tag, executor in (tag_view_executors or {}).items()
+        }
+        self.metrics: Optional[Metrics] = None
+        if metrics:
+            self.metrics = Metrics(metrics_buckets)
+        self.metrics_path = metrics_path
+        self.server_timing = server_timing
+        self.server_timing_token = server_timing_token
+        self.server_timing_header = server_timing_header
+        self.profiler = profiler
+        self._openapi_cache: "weakref.WeakKeyDictionary" = \
+            weakref.WeakKeyDictionary()
         if app is not None:
             self.init_app(app)
 
@@ -109,13 +264,26 @@ class SchemaValidator:
         )
 
         try:
-            if isinstance(app, Flask):
-                IS_FLASK = True
-            else:
-                IS_FLASK = False
-        except BaseException:
+            from flask import Flask
+            IS_FLASK = isinstance(app, Flask)
+        except ImportError:
             IS_FLASK = False
 
+        if not IS_FLASK:
+            @app.after_serving
+            async def shutdown_offload_executor() -> None:
+                self.shutdown_offload_executor()
+
+        if self.metrics is not None and self.metrics_path is not None:
+            if IS_FLASK:
+                from .flask import metrics
+            else:
+                from .quart import metrics
+            app.add_url_rule(
+                self.metrics_path, "schema_metrics",
+                lambda: metrics(validator=self)
+            )
+
         if self.openapi_path is not None and app.config.get("SWAGGER_ROUTE"):
             if IS_FLASK:
                 from .flask import openapi, swagger_ui
@@ -146,6 +314,283 @@ class SchemaValidator:
                     lambda tag: swagger_ui(self, tag)
                 )
 
+    def pending_preparations(self, app=None) -> int:
+        """The number of views of the app, the current app by default,
+        decorated with validate whose models are not prepared yet.
+        """
+        app = _app_object(app) if app is not None else _current_app()
+        preparations = {
+            getattr(view, SCHEMA_PREPARATION_ATTRIBUTE, None)
+            for _, _, _, view in _iter_views(app)
+        }
+        return sum(
+            not preparation.prepared for preparation in preparations
+            if preparation is not None
+        )
+
+    def start_timings(
+        self,
+        endpoint: Optional[str],
+        headers: Any
+    ) -> Optional[Timings]:
+        """The Timings recorded for the request with the headers, None if
+        it is not instrumented.
+        """
+        server_timing = self.server_timing
+        if not server_timing and self.server_timing_token is not None:
+            token = headers.get(self.server_timing_header)
+            server_timing = token is not None and hmac.compare_digest(
+                token.encode(), self.server_timing_token.encode())
+        if self.profiler is not None:
+            return Timings(server_timing, self.profiler.start(endpoint))
+        if self.metrics is None and not server_timing:
+            return None
+        return Timings(server_timing)
+
+    def record_timings(
+        self,
+        endpoint: Optional[str],
+        timings: Timings,
+        models: Iterable[str] = ()
+    ) -> None:
+        if self.metrics is not None:
+            self.metrics.record(endpoint, timings)
+        if self.profiler is not None:
+            self.profiler.finish(endpoint, timings, models)
+
+    @property
+    def offload_executor(self) -> ObservedExecutor:
+        if self._observed_offload_executor is None:
+            self._observed_offload_executor = ObservedExecutor(
+                self._offload_executor, self.offload_workers)
+        return self._observed_offload_executor
+
+    def shutdown_offload_executor(self) -> None:
+        """Shut down the default thread pool of the offload executor
+        without waiting for the calls in progress, a new one is created
+        on the next offloaded call. An executor given as offload_executor
+        is left to its owner.
+        """
+        executor = self._observed_offload_executor
+        if executor is not None and self._offload_executor is None:
+            self._observed_offload_executor = None
+            executor.shutdown(wait=False)
+
+    def offload_stats(self) -> Dict[str, Any]:
+        """The pool size and queue depth of the offload executor."""
+        if self._observed_offload_executor is None:
+            return {"max_workers": self.offload_workers, "pending": 0}
+        return self._observed_offload_executor.stats()
+
+    def get_view_executor(
+        self,
+        tags: Iterable[str] = ()
+    ) -> Optional[ObservedExecutor]:
+        """The executor of the first tag which has one, else the app's."""
+        for tag in tags:
+            executor = self.tag_view_executors.get(tag)
+            if executor is not None:
+                return executor
+        return self.view_executor
+
+    def view_executor_stats(self) -> Dict[str, Dict[str, Any]]:
+        """The counters of the view executors, by tag, "" for the app."""
+        stats = {
+            tag: executor.stats()
+            for tag, executor in self.tag_view_executors.items()
+        }
+        if self.view_executor is not None:
+            stats[""] = self.view_executor.stats()
+        return stats
+
+    def report_response_error(
+        self,
+        endpoint: str,
+        error: Exception,
+        rate: Optional[float] = None
+    ) -> bool:
+        """Report a failed response validation, rate is the validation
+        rate of the endpoint.
+
+        Returns False if the failure should be turned into a 400.
+        """
+        if self.response_validation_error_handler is not None:
+            self.response_validation_error_handler(endpoint, error)
+            return True
+        if rate is None:
+            rate = self.response_validation_rate
+        if rate < 1.0:
+            logger.warning(
+                f"response validation failed on {endpoint}: {error}")
+            return True
+        return False
+
+    def get_openapi_document(
+        self,
+        app,
+        tag: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """Return the serialized openapi document and its etag.
+
+        The document is built once per tag and casing setting and is
+        rebuilt when rules or view functions are added to the app.
+        """
+        documents = self._openapi_documents(app)
+        key = (tag, self.convert_casing)
+        document = documents.get(key)
+        if document is None:
+            document = self._serialize_openapi(
+                _build_openapi_schema(app, self, tag))
+            documents[key] = document
+        return document
+
+    def _openapi_documents(
+        self,
+        app
+    ) -> Dict[Tuple[Optional[str], bool], Tuple[bytes, str]]:
+        """The cached documents of the app, emptied if it changed."""
+        fingerprint = _app_fingerprint(app)
+        documents = self._openapi_cache.get(app)
+        if documents is None or documents[0] != fingerprint:
+            documents = (fingerprint, {})
+            self._openapi_cache[app] = documents
+        return documents[1]
+
+    def _serialize_openapi(self, schema: dict) -> Tuple[bytes, str]:
+        content = self.json_backend.dumps(schema)
+        return content, sha1(content).hexdigest()
+
+    def warmup(self, app, freeze: bool = False) -> Dict[str, int]:
+        """Prepare the views of the app decorated with validate, and
+        build the openapi documents of every tag, before the workers are
+        forked, e.g. in the app factory loaded by gunicorn --preload.
+
+        The views are prepared, and the documents built, in one pass
+        over the routes.
+
+        With freeze, the objects are then moved to the permanent
+        generation of the gc, so that collections in the workers do not
+        write to the pages shared with the parent. No collection runs
+        before, it would leave freed holes in the shared pages, call
+        gc.disable() early in the app factory and gc.enable() in the
+        workers after the fork for the most sharing.
+        """
+        app = _app_object(app)
+        pending = self.pending_preparations(app)
+        schemas = _build_openapi_schemas(app, self)
+        documents = self._openapi_documents(app)
+        for tag, schema in schemas.items():
+            documents[(tag, self.convert_casing)] = \
+                self._serialize_openapi(schema)
+        remaining = self.pending_preparations(app)
+
+        if freeze:
+            gc.freeze()
+        return {
+            "prepared": pending - remaining,
+            "documents": len(schemas),
+            "pending": remaining,
+        }
+
+
+class ModelSchemaRegistry:
+    """Process wide memo of the openapi schema of each model.
+
+    Entries are keyed by the model class, held weakly, and the casing
+    mode. The returned dicts are shared and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        self._schemas: "weakref.WeakKeyDictionary" = \
+            weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        model_class: PydanticModel,
+        convert_casing: bool = False
+    ) -> Tuple[dict, dict]:
+        """Return the definitions and the schema of the model."""
+        entries = self._schemas.get(model_class)
+        if entries is None:
+            entries = self._schemas.setdefault(model_class, {})
+
+        entry = entries.get(convert_casing)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        schema = model_schema(model_class, ref_prefix=REF_PREFIX)
+        if convert_casing:
+            schema = camelize(schema)
+        entry = entries[convert_casing] = _split_definitions(schema)
+        return entry
+
+    def clear(self) -> None:
+        self._schemas.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._schemas.values())
+
+
+model_schemas = ModelSchemaRegistry()
+
+
+def _current_app() -> Any:
+    """The app of the active app context, flask or quart, the module level
+    current_app is the one of quart whenever quart is installed.
+    """
+    try:
+        from flask import current_app as flask_app, has_app_context
+    except ImportError:
+        pass
+    else:
+        if has_app_context():
+            return flask_app._get_current_object()
+    return current_app._get_current_object()
+
+
+def _app_object(app) -> Any:
+    """The app behind the current_app proxy."""
+    if hasattr(app, "_get_current_object"):
+        return app._get_current_object()
+    return app
+
+
+def _iter_views(app) -> Iterator[Tuple[Any, str, Any, Callable]]:
+    """(rule, method, view class or None, view) of the routes of the app,
+    the view is the method of the view class if it has one.
+    """
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint in INTERNAL_ENDPOINTS:
+            continue
+        func = app.view_functions[rule.endpoint]
+        view_class = getattr(func, "view_class", None)
+        for method in rule.methods - IGNORE_METHODS:
+            view = None
+            if view_class is not None:
+                view = getattr(view_class, method.lower(), None)
+            yield rule, method, view_class, view or func
+
+
+def _app_fingerprint(app) -> Tuple[Tuple[int, ...], Tuple[Any, ...]]:
+    """The identities of the rules and of the view functions of the app,
+    which change when a view is replaced or a rule added or removed. The
+    objects are not held, the app would be kept alive by the views
+    referencing it.
+    """
+    return (
+        tuple(map(id, app.url_map.iter_rules())),
+        tuple(
+            (endpoint, id(view))
+            for endpoint, view in app.view_functions.items()
+        ),
+    )
+
 
 def _split_definitions(schema: dict) -> Tuple[dict, dict]:
     new_schema = schema.copy()
@@ -162,120 +607,168 @@ def _build_openapi_schema(
     params:
         expected_tag: str
     """
-    paths: Dict[str, dict] = {}
-    components = {"schemas": {}}
+    schemas = _build_openapi_schemas(app, extension, [expected_tag])
+    return schemas[expected_tag]
 
-    for rule in app.url_map.iter_rules():
-        if rule.endpoint in [
-            "static", "openapi", "swagger_ui",
-            "swagger_ui_tag", "openapi_tag"
-        ]:
-            continue
 
-        func = app.view_functions[rule.endpoint]
+def _build_openapi_schemas(
+    app,
+    extension: SchemaValidator,
+    expected_tags: Optional[Iterable[Optional[str]]] = None
+) -> Dict[Optional[str], dict]:
+    """The openapi schemas of the expected tags, None or "" for the
+    schema of all the views, built in one pass over the views.
 
-        for method in rule.methods - IGNORE_METHODS:
-            view_func = None
-            view_class = getattr(func, "view_class", None)
+    Without expected_tags, the schemas of all the views and of each of
+    their tags.
+    """
+    all_tags = expected_tags is None
+    documents = {
+        tag: {"paths": {}, "components": {"schemas": {}}}
+        for tag in ([None] if all_tags else expected_tags)
+    }
 
-            if view_class is not None:
-                view_func = getattr(view_class, method.lower(), None)
+    for rule, method, view_class, function in _iter_views(app):
+        path_object = {
+            "parameters": [], "responses": {},
+        }
+
+        if function.__doc__ is not None:
+            summary, *description = function.__doc__.splitlines()
+            path_object["description"] = "\n".join(description)
+            path_object["summary"] = summary
 
-            path_object = {
-                "parameters": [], "responses": {},
+        if view_class:
+            tags = getattr(view_class, SCHEMA_TAG_ATTRIBUTE, [])
+        else:
+            tags = getattr(function, SCHEMA_TAG_ATTRIBUTE, [])
+
+        if tags:
+            path_object["tags"] = tags
+
+        if all_tags:
+            for tag in tags:
+                documents.setdefault(
+                    tag, {"paths": {}, "components": {"schemas": {}}})
+        targets = [
+            document for tag, document in documents.items()
+            if not tag or tag in tags
+        ]
+        if not targets:
+            continue
+        operation_schemas: Dict[str, Any] = {}
+
+        prepare_view(function)
+
+        response_models = getattr(function, SCHEMA_RESPONSE_ATTRIBUTE, {})
+
+        for status_code, model_class in response_models.items():
+            definitions, schema = model_schemas.get(
+                model_class, extension.convert_casing)
+            operation_schemas.update(definitions)
+            path_object["responses"][status_code] = {  # type: ignore
+                "content": {
+                    "application/json": {
+                        "schema": schema,
+                    },
+                },
+                "description": model_class.__doc__,
             }
-            function = view_func or func
 
-            if function.__doc__ is not None:
-                summary, *description = function.__doc__.splitlines()
-                path_object["description"] = "\n".join(description)
-                path_object["summary"] = summary
+        request_data = getattr(function, SCHEMA_REQUEST_ATTRIBUTE, None)
 
-            if view_class:
-                tags = getattr(view_class, SCHEMA_TAG_ATTRIBUTE, [])
+        if request_data is not None:
+            body = request_data[0]
+            if isinstance(body, ListBody):
+                definitions, schema = model_schemas.get(
+                    body.item_model, extension.convert_casing)
+                schema = {"type": "array", "items": schema}
             else:
-                tags = getattr(func, SCHEMA_TAG_ATTRIBUTE, [])
-
-            if tags:
-                path_object["tags"] = tags
-
-            if expected_tag and expected_tag not in tags:
-                continue
-
-            response_models = getattr(function, SCHEMA_RESPONSE_ATTRIBUTE, {})
-
-            for status_code, model_class in response_models.items():
-                schema = model_schema(model_class, ref_prefix=REF_PREFIX)
-                if extension.convert_casing:
-                    schema = camelize(schema)
-                definitions, schema = _split_definitions(schema)
-                components["schemas"].update(definitions)
-                path_object["responses"][status_code] = {  # type: ignore
-                    "content": {
-                        "application/json": {
-                            "schema": schema,
-                        },
-                    },
-                    "description": model_class.__doc__,
-                }
+                definitions, schema = model_schemas.get(
+                    body, extension.convert_casing)
+            operation_schemas.update(definitions)
+
+            if request_data[1] == DataSource.JSON:
+                encoding = "application/json"
+            elif request_data[1] == DataSource.NDJSON:
+                encoding = "application/x-ndjson"
+            elif request_data[1] == DataSource.JSON_STREAM:
+                encoding = "application/json"
+                schema = {"type": "array", "items": schema}
+            else:
+                encoding = "application/x-www-form-urlencoded"
 
-            request_data = getattr(function, SCHEMA_REQUEST_ATTRIBUTE, None)
-
-            if request_data is not None:
-                schema = model_schema(request_data[0], ref_prefix=REF_PREFIX)
-                if extension.convert_casing:
-                    schema = camelize(schema)
-                definitions, schema = _split_definitions(schema)
-                components["schemas"].update(definitions)
-
-                if request_data[1] == DataSource.JSON:
-                    encoding = "application/json"
-                else:
-                    encoding = "application/x-www-form-urlencoded"
-
-                path_object["requestBody"] = {
-                    "content": {
-                        encoding: {
-                            "schema": schema,
-                        },
+            path_object["requestBody"] = {
+                "content": {
+                    encoding: {
+                        "schema": schema,
                     },
-                }
+                },
+            }
 
-            querystring_model = getattr(
-                function, SCHEMA_QUERYSTRING_ATTRIBUTE, None)
-            if querystring_model is not None:
-                schema = model_schema(querystring_model, ref_prefix=REF_PREFIX)
-                if extension.convert_casing:
-                    schema = camelize(schema)
-                definitions, schema = _split_definitions(schema)
-                components["schemas"].update(definitions)
-                for name, type_ in schema["properties"].items():
-                    path_object["parameters"].append(
-                        {
-                            "name": name,
-                            "in": "query",
-                            "schema": type_,
-                        }
-                    )
-            for name, converter in rule._converters.items():
+        querystring_model = getattr(
+            function, SCHEMA_QUERYSTRING_ATTRIBUTE, None)
+        if querystring_model is not None:
+            definitions, schema = model_schemas.get(
+                querystring_model, extension.convert_casing)
+            operation_schemas.update(definitions)
+            for name, type_ in schema["properties"].items():
                 path_object["parameters"].append(
                     {
                         "name": name,
-                        "in": "path",
+                        "in": "query",
+                        "schema": type_,
+                    }
+                )
+        headers_model = getattr(function, SCHEMA_HEADERS_ATTRIBUTE, None)
+        if headers_model is not None:
+            definitions, schema = model_schemas.get(headers_model, False)
+            operation_schemas.update(definitions)
+            required = set(schema.get("required", ()))
+            for name, type_ in schema["properties"].items():
+                path_object["parameters"].append(
+                    {
+                        "name": header_name(name),
+                        "in": "header",
+                        "required": name in required,
+                        "schema": type_,
                     }
                 )
-            path = re.sub(PATH_RE, r"{\1}", rule.rule)
-            paths.setdefault(path, {})
-            paths[path][method.lower()] = path_object
+        path_properties = {}
+        path_model = getattr(function, SCHEMA_PATH_ATTRIBUTE, None)
+        if path_model is not None:
+            definitions, schema = model_schemas.get(path_model, False)
+            operation_schemas.update(definitions)
+            path_properties = schema["properties"]
+        for name, converter in rule._converters.items():
+            schema = path_properties.get(name)
+            if schema is None:
+                schema = PATH_SCHEMAS[converter_type(converter)]
+            path_object["parameters"].append(
+                {
+                    "name": name,
+                    "in": "path",
+                    "required": True,
+                    "schema": schema,
+                }
+            )
+        path = re.sub(PATH_RE, r"{\1}", rule.rule)
+        for document in targets:
+            document["components"]["schemas"].update(operation_schemas)
+            document["paths"].setdefault(path, {})
+            document["paths"][path][method.lower()] = path_object
 
     return {
-        "openapi": "3.0.3",
-        "info": {
-            "title": extension.title,
-            "version": extension.version,
-        },
-        "components": components,
-        "paths": paths,
-        "tags": [],
-        "servers": extension.servers,
+        tag: {
+            "openapi": "3.0.3",
+            "info": {
+                "title": extension.title,
+                "version": extension.version,
+            },
+            "components": document["components"],
+            "paths": document["paths"],
+            "tags": [],
+            "servers": extension.servers,
+        }
+        for tag, document in documents.items()
     }
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional, Union
+
+
+class ExecutorFullError(Exception):
+    """The executor already has max_queue calls waiting."""
+
+
+class ObservedExecutor:
+    """Run callables from coroutines in an executor and keep count of
+    them.
+
+    pending: submitted and not yet finished.
+    running: started in a worker thread, not known for process pools.
+    queued: waiting for a worker.
+    wait_time: the seconds spent queued by the started calls.
+
+    With max_queue, run raises ExecutorFullError instead of queueing
+    more calls.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None
+    ) -> None:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers, thread_name_prefix="schema-validator")
+        self.executor = executor
+        self.max_workers = getattr(executor, "_max_workers", max_workers)
+        self.max_queue = max_queue
+        self.is_process_pool = isinstance(executor, ProcessPoolExecutor)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _call(self, submitted: float, func: Callable, *args: Any) -> Any:
+        waited = perf_counter() - submitted
+        with self._lock:
+            self.running += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.is_process_pool:
+            call = partial(func, *args)
+        else:
+            call = partial(self._call, perf_counter(), func, *args)
+        with self._lock:
+            if self.max_queue is not None and self.max_workers is not None \
+                    and self.pending >= self.max_workers + self.max_queue:
+                raise ExecutorFullError(
+                    f"{self.pending} calls are pending in the executor")
+            self.pending += 1
+        try:
+            return await loop.run_in_executor(self.executor, call)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "running": self.running,
+                "queued": max(self.pending - self.running, 0),
+                "completed": self.completed,
+                "wait_time": self.wait_time,
+                "max_wait_time": self.max_wait_time,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+
+def observe(
+    executor: Union[int, Executor, ObservedExecutor],
+    max_queue: Optional[int] = None
+) -> ObservedExecutor:
+    """An ObservedExecutor of the executor, or of a thread pool if an
+    int number of workers is given.
+    """
+    if isinstance(executor, ObservedExecutor):
+        return executor
+    if isinstance(executor, int):
+        return ObservedExecutor(max_workers=executor, max_queue=max_queue)
+    return ObservedExecutor(executor, max_queue=max_queue)
@@ -1,23 +1,59 @@
-from dataclasses import asdict, is_dataclass
-from functools import wraps
-from typing import (Any, Callable, Dict, Iterable, List, Optional, Union, cast)
-
-from pydantic import BaseModel, ValidationError
-from pydantic.dataclasses import is_builtin_dataclass
-from flask import Response, current_app, g, jsonify, request
-from werkzeug.datastructures import Headers
+from functools import partial, wraps
+from io import BytesIO
+from random import random
+from time import perf_counter
+from collections.abc import AsyncIterator, Iterator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from flask import (
+    Response, current_app, g, request, stream_with_context
+)
+from werkzeug.datastructures import Headers, MultiDict
 from werkzeug.exceptions import BadRequest
 
-from schema_validator.constants import (
-    SCHEMA_QUERYSTRING_ATTRIBUTE, SCHEMA_REQUEST_ATTRIBUTE,
-    SCHEMA_RESPONSE_ATTRIBUTE, SCHEMA_TAG_ATTRIBUTE
-)
+from schema_validator.constants import SCHEMA_PREPARATION_ATTRIBUTE, \
+    SCHEMA_TAG_ATTRIBUTE
+from schema_validator.json_backend import JSONBackend, get_json_backend
+from schema_validator.metrics import Timings
+from schema_validator.preparation import Preparation
 from schema_validator.types import PydanticModel
-from schema_validator.utils import DataSource, check_body_schema, \
-    check_query_string_schema, check_response_schema
+from schema_validator.streaming import CHUNK_SIZE, ResponseStream, \
+    body_stream, response_converter
+from schema_validator.utils import INHERIT, STREAM_SOURCES, \
+    BodyLimitError, BodyLimits, DataSource, HeaderParser, Inherit, \
+    ListBody, QueryStringParser, ValidationPlan, check_validation_rate, \
+    load_json_body, prepare_plan, render_validation_errors, \
+    response_to_dict, validate_json_body
+
+
+def _json_response(
+    json_backend: JSONBackend,
+    object_: Any,
+    status: Optional[int] = None
+) -> Response:
+    return Response(
+        json_backend.dumps(object_), status=status,
+        mimetype="application/json"
+    )
+
+
+def _error_response(
+    extension: Any,
+    errors: Dict[str, Exception],
+    status: int = BadRequest.code
+) -> Response:
+    return _json_response(
+        get_json_backend(extension),
+        render_validation_errors(extension, errors),
+        status
+    )
 
 
-def check_response(result, response_model: Dict[int, PydanticModel]):
+def check_response(
+    result,
+    plan: ValidationPlan,
+    timings: Optional[Timings] = None
+):
     status_or_headers: Union[None, int, str, Dict, List] = None
     headers: Optional[Headers] = None
 
@@ -27,58 +63,206 @@ def check_response(result, response_model: Dict[int, PydanticModel]):
     else:
         value = result
 
-    if isinstance(value, Response):
-        value = value.get_json()
-
     status = 200
     if status_or_headers is not None and not isinstance(
         status_or_headers, (Headers, dict, list)
     ) and str(status_or_headers).isdigit():
         status = int(status_or_headers)
 
-    bad_status = BadRequest.code
+    if status not in plan.responses:
+        return result
+
+    extension = current_app.extensions.get("SCHEMA_VALIDATOR")
+    json_backend = get_json_backend(extension)
+    rate = plan.validation_rate(extension)
+    sampled = rate >= 1.0 or random() < rate
+    if isinstance(value, AsyncIterator):
+        raise TypeError(
+            f"{request.endpoint} returned an async iterator, flask streams "
+            "the items of sync iterators only"
+        )
+    if isinstance(value, Iterator):
+        convert = response_converter(
+            plan, status, extension, request.endpoint, sampled)
+        stream = ResponseStream(
+            value, convert, json_backend.dumps, plan.response_format)
+        return (
+            Response(
+                stream_with_context(iter(stream)), mimetype=stream.mimetype),
+            status_or_headers,
+            headers
+        )
+    start = perf_counter()
+    if not sampled:
+        if isinstance(value, Response):
+            return result
+        model_value = response_to_dict(value)
+    else:
+        returned = isinstance(value, Response)
+        try:
+            if returned:
+                value = json_backend.loads(value.get_data())
+            model_value = plan.convert_response(status, value)
+        except (TypeError, ValueError) as ve:
+            if extension is None or not extension.report_response_error(
+                request.endpoint, ve, rate
+            ):
+                return _error_response(extension, {"response": ve})
+            if returned:
+                return result
+            model_value = response_to_dict(value)
+    validated = perf_counter()
+    data = json_backend.dumps(model_value)
+    if timings is not None:
+        timings.response_validate = validated - start
+        timings.serialize = perf_counter() - validated
+        timings.response_bytes = len(data)
+    return (
+        Response(data, mimetype="application/json"),
+        status_or_headers,
+        headers
+    )
 
-    for status_code, model_cls in response_model.items():
-        if status_code != status:
-            continue
-        if isinstance(value, dict):
-            try:
-                model_value = model_cls(**value)
-            except (TypeError, ValidationError) as ve:
-                return jsonify(validation_error=str(ve)), bad_status
-        elif type(value) == model_cls:
-            model_value = value
-        elif is_builtin_dataclass(value):
-            model_value = model_cls(**asdict(value))
-        else:
-            return jsonify(validation_error="invalid response"), bad_status
-        if is_dataclass(model_value):
-            return asdict(model_value), status_or_headers, headers
-        else:
-            model_value = cast(BaseModel, model_value)
-            return model_value.dict(), status_or_headers, headers
-    return result
+
+def _body_chunks(extension: Any, limits: BodyLimits) -> Iterable[bytes]:
+    """The chunks of the request body, its size is checked against the
+    Content-Length before it is read and again as it is read.
+    """
+    limits.check_size(extension, request.content_length)
+    chunks = iter(partial(request.stream.read, CHUNK_SIZE), b"")
+    if limits.size_limit(extension) is None:
+        return chunks
+    return _counted_chunks(chunks, extension, limits)
+
+
+def _counted_chunks(
+    chunks: Iterable[bytes],
+    extension: Any,
+    limits: BodyLimits
+) -> Iterable[bytes]:
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        limits.check_size(extension, size)
+        yield chunk
+
+
+def _read_body(extension: Any, limits: BodyLimits) -> bytes:
+    if request.content_length is None:
+        return b"".join(_body_chunks(extension, limits))
+    # the stream is limited to the checked Content-Length
+    limits.check_size(extension, request.content_length)
+    return request.get_data()
+
+
+def _read_form(extension: Any, limits: BodyLimits) -> MultiDict:
+    data = _read_body(extension, limits)
+    _, form, _ = request.make_form_data_parser().parse(
+        BytesIO(data), request.mimetype, len(data), request.mimetype_params)
+    return form
+
+
+def _body_extractor(
+    body: Union[PydanticModel, ListBody],
+    source: DataSource,
+    max_body_errors: Union[None, int, Inherit],
+    limits: BodyLimits
+) -> Callable:
+    def _max_errors(extension: Any) -> Optional[int]:
+        if max_body_errors is INHERIT:
+            return getattr(extension, "max_body_errors", None)
+        return max_body_errors
+
+    if isinstance(body, ListBody) or source == DataSource.JSON:
+        def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            start = perf_counter()
+            data = _read_body(extension, limits) if request.is_json else None
+            value = load_json_body(
+                get_json_backend(extension), data, limits.resolve(extension))
+            if timings is not None:
+                timings.parse = perf_counter() - start
+                timings.request_bytes = len(data or b"")
+            return validate_json_body(body, value, _max_errors(extension))
+    elif source in STREAM_SOURCES:
+        def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            return body_stream(
+                _body_chunks(extension, limits), body, source, extension,
+                _max_errors(extension)
+            )
+    else:
+        def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            return body(**_read_form(extension, limits))
+    return extract
+
+
+def _headers_extractor(headers: PydanticModel) -> Callable:
+    parse = HeaderParser(headers).parse_environ
+
+    def extract(extension: Any, timings: Optional[Timings]) -> Any:
+        return parse(request.environ)
+    return extract
+
+
+def _query_string_extractor(query_string: PydanticModel) -> Callable:
+    parse = QueryStringParser(query_string).parse
+
+    def extract(extension: Any, timings: Optional[Timings]) -> Any:
+        return parse(request.args)
+    return extract
 
 
 def validate(
     query_string: Optional[PydanticModel] = None,
     body: Optional[PydanticModel] = None,
     source: DataSource = DataSource.JSON,
-    validate_path_args: bool = False,
+    validate_path_args: Union[bool, PydanticModel] = False,
     responses: Union[PydanticModel, Dict[int, PydanticModel], None] = None,
     headers: Optional[PydanticModel] = None,
-    tags: Optional[Iterable[str]] = None
+    tags: Optional[Iterable[str]] = None,
+    response_validation_rate: Optional[float] = None,
+    response_format: DataSource = DataSource.JSON_STREAM,
+    max_body_errors: Union[None, int, Inherit] = INHERIT,
+    max_body_size: Optional[int] = None,
+    max_body_depth: Optional[int] = None,
+    max_array_length: Optional[int] = None,
+    max_object_keys: Optional[int] = None
 ) -> Callable:
     """
     params:
         query_string:
             the params in query
         body:
-            json body or form
+            json body or form, or List[Item] for a json list of items
         source:
-            the body source
+            the body source, g.body_params is a BodyStream of the
+            validated items for DataSource.NDJSON and JSON_STREAM
         response:
             response model define
+        validate_path_args:
+            True to validate the path arguments with the type annotations
+            of the view, or their model, the validated values are passed
+            to the view
+        headers:
+            the headers model, g.header_params, a field x_request_id
+            validates the X-Request-Id header
+        response_validation_rate:
+            the fraction of responses to validate, overrides the rate
+            of the SchemaValidator
+        response_format:
+            DataSource.JSON_STREAM or DataSource.NDJSON, how an iterator
+            returned by the view is validated and streamed item by item
+        max_body_errors:
+            for List[Item] bodies, stop validating after so many invalid
+            items, 1 to fail fast, None to validate all the items,
+            overrides the SchemaValidator setting by default
+        max_body_size, max_body_depth, max_array_length, max_object_keys:
+            limits of the body checked as it is read (413) and of the
+            parsed json before the model is built (400), override the
+            limits of the SchemaValidator
+
+    The models are converted and checked, and the validation compiled,
+    on the first request of the view, on openapi generation or by
+    schema_validator.preparation.prepare_all().
 
     from dataclasses import dataclass
     from datetime import datetime
@@ -128,65 +312,80 @@ def validate(
             return {}
     """
 
-    # TODO
-    if validate_path_args:
-        pass
-    # TODO
-    if headers is not None:
-        pass
-
-    if query_string is not None:
-        query_string = check_query_string_schema(query_string)
-
-    if body is not None:
-        body = check_body_schema(body, source)
-
-    if responses is not None:
-        responses = check_response_schema(responses)
+    check_validation_rate(response_validation_rate)
+    limits = BodyLimits(
+        max_body_size, max_body_depth, max_array_length, max_object_keys)
 
     def decorator(func: Callable) -> Callable:
-
-        if query_string:
-            setattr(func, SCHEMA_QUERYSTRING_ATTRIBUTE, query_string)
-        if body:
-            setattr(func, SCHEMA_REQUEST_ATTRIBUTE, (body, source))
-        if responses:
-            setattr(func, SCHEMA_RESPONSE_ATTRIBUTE, responses)
         if tags:
             setattr(func, SCHEMA_TAG_ATTRIBUTE, list(set(tags)))
 
+        preparation = Preparation(lambda: prepare_plan(
+            func, query_string, body, source, validate_path_args,
+            responses, headers, response_validation_rate, response_format,
+            max_body_errors, limits, (func, wrapper), _body_extractor,
+            _query_string_extractor, _headers_extractor
+        ))
+
         @wraps(func)
         def wrapper(*args: Any, **kwargs: Any) -> Any:
+            plan = preparation.get()
+            extension = current_app.extensions.get("SCHEMA_VALIDATOR")
+            timings = None
+            if extension is not None:
+                timings = extension.start_timings(
+                    request.endpoint, request.headers)
+            try:
+                result = validated_call(
+                    plan, extension, timings, args, kwargs)
+            finally:
+                if timings is not None:
+                    extension.record_timings(
+                        request.endpoint, timings, plan.model_names)
+            if timings is not None and timings.server_timing:
+                result = current_app.make_response(result)
+                result.headers["Server-Timing"] = \
+                    timings.server_timing_header()
+            return result
+
+        def validated_call(
+            plan: ValidationPlan,
+            extension: Any,
+            timings: Optional[Timings],
+            args: tuple,
+            kwargs: dict
+        ) -> Any:
+            start = perf_counter()
             err = {}
-            if body:
-                if source == DataSource.JSON:
-                    data = request.get_json()
-                else:
-                    data = request.form
+            if plan.path_args is not None:
                 try:
-                    body_model = body(**data)
-                except (TypeError, ValidationError) as ve:
-                    err["body_params"] = str(ve)
-                else:
-                    g.body_params = body_model
-
-            if query_string:
+                    kwargs.update(
+                        plan.path_args.parse(request.url_rule, kwargs))
+                except (TypeError, ValueError) as ve:
+                    err["path_params"] = ve
+            for name, extract in plan.extractors:
                 try:
-                    query_params = query_string(**request.args)
-                except (TypeError, ValidationError) as ve:
-                    err["query_params"] = str(ve)
-                else:
-                    g.query_params = query_params
+                    setattr(g, name, extract(extension, timings))
+                except BodyLimitError as e:
+                    return _error_response(extension, {name: e}, e.status)
+                except (TypeError, ValueError) as ve:
+                    err[name] = ve
+            validated = perf_counter()
+            if timings is not None:
+                timings.validate = validated - start - (timings.parse or 0.0)
 
             if err:
-                return jsonify(validation_error=err), BadRequest.code
+                return _error_response(extension, err)
 
             result = current_app.ensure_sync(func)(*args, **kwargs)
+            if timings is not None:
+                timings.view = perf_counter() - validated
 
-            if responses:
-                return check_response(result, responses)
+            if plan.responses:
+                return check_response(result, plan, timings)
             return result
 
+        setattr(wrapper, SCHEMA_PREPARATION_ATTRIBUTE, preparation)
         return wrapper
 
     return decorator
@@ -0,0 +1,97 @@
+import json
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Any, Optional, Union
+
+from pydantic.json import pydantic_encoder
+
+from schema_validator.casing import camelize, decamelize
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONBackend(ABC):
+    """The json backend used to parse validated requests and to encode
+    validated responses and validation errors.
+
+        class MyBackend(JSONBackend):
+            def dumps(self, object_):
+                ...
+
+            def loads(self, data):
+                ...
+
+        SchemaValidator(app, json_backend=MyBackend())
+    """
+
+    @abstractmethod
+    def dumps(self, object_: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def loads(self, data: Union[bytes, str]) -> Any:
+        ...
+
+
+class StdlibJSONBackend(JSONBackend):
+    def dumps(self, object_: Any) -> bytes:
+        return json.dumps(
+            object_, default=pydantic_encoder, separators=(",", ":")
+        ).encode()
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonJSONBackend(JSONBackend):
+    def __init__(self) -> None:
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+
+    def dumps(self, object_: Any) -> bytes:
+        return orjson.dumps(
+            object_, default=pydantic_encoder,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+class CasingJSONBackend(JSONBackend):
+    """Camelize the encoded and decamelize the decoded keys."""
+
+    def __init__(self, backend: JSONBackend) -> None:
+        self.backend = backend
+
+    def dumps(self, object_: Any) -> bytes:
+        if isinstance(object_, (list, Mapping)):
+            object_ = camelize(object_)
+        return self.backend.dumps(object_)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return decamelize(self.backend.loads(data))
+
+
+def default_json_backend() -> JSONBackend:
+    """orjson if it is installed, else the stdlib json."""
+    if orjson is not None:
+        return OrjsonJSONBackend()
+    return StdlibJSONBackend()
+
+
+_default_backend: Optional[JSONBackend] = None
+
+
+def get_json_backend(extension: Any) -> JSONBackend:
+    """The backend of the extension or the default one."""
+    global _default_backend
+    backend = getattr(extension, "json_backend", None)
+    if backend is not None:
+        return backend
+    if _default_backend is None:
+        _default_backend = default_json_backend()
+    return _default_backend
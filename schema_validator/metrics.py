@@ -0,0 +1,167 @@
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PHASES = ("parse", "validate", "view", "response_validate", "serialize")
+
+# seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Timings:
+    """The phase durations in seconds and payload sizes in bytes of a
+    request through validate, the phases which did not run are None.
+    """
+
+    __slots__ = PHASES + (
+        "request_bytes", "response_bytes", "server_timing", "capture"
+    )
+
+    def __init__(
+        self,
+        server_timing: bool = False,
+        capture: Any = None
+    ) -> None:
+        self.server_timing = server_timing
+        # the running profile of the request
+        self.capture = capture
+        self.parse: Optional[float] = None
+        self.validate: Optional[float] = None
+        self.view: Optional[float] = None
+        self.response_validate: Optional[float] = None
+        self.serialize: Optional[float] = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def phases(self) -> Iterable[Tuple[str, float]]:
+        """The (phase, duration) of the phases which ran."""
+        for phase in PHASES:
+            value = getattr(self, phase)
+            if value is not None:
+                yield phase, value
+
+    def total(self) -> float:
+        return sum(value for _, value in self.phases())
+
+    def server_timing_header(self) -> str:
+        """The value of the Server-Timing header, durations in ms."""
+        metrics = [
+            f"{phase};dur={value * 1000:.3f}"
+            for phase, value in self.phases()
+        ]
+        metrics.append(f'request_bytes;desc="{self.request_bytes}"')
+        metrics.append(f'response_bytes;desc="{self.response_bytes}"')
+        return ", ".join(metrics)
+
+
+class Histogram:
+    """A histogram of preallocated buckets, counts[i] is the number of
+    values <= bounds[i] and > bounds[i - 1], the last count is of the
+    values over the last bound.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def values(self) -> Tuple[List[int], float, int]:
+        """The cumulative counts, the sum and the count."""
+        with self._lock:
+            counts = list(self.counts)
+            sum_, count = self.sum, self.count
+        total = 0
+        for index, value in enumerate(counts):
+            total += value
+            counts[index] = total
+        return counts, sum_, count
+
+    def snapshot(self) -> Dict[str, Any]:
+        counts, sum_, count = self.values()
+        return {
+            "buckets": dict(zip(self.bounds, counts)),
+            "sum": sum_,
+            "count": count,
+        }
+
+
+class Metrics:
+    """The phase duration histograms of the endpoints decorated with
+    validate, the histograms of an endpoint are allocated on its first
+    request.
+
+        validator = SchemaValidator(app, metrics=True)
+        validator.metrics.snapshot()["create_todo"]["view"]["count"]
+    """
+
+    def __init__(self, buckets: Optional[Iterable[float]] = None) -> None:
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, Histogram]] = {}
+
+    def histograms(self, endpoint: str) -> Dict[str, Histogram]:
+        histograms = self._endpoints.get(endpoint)
+        if histograms is None:
+            with self._lock:
+                histograms = self._endpoints.setdefault(endpoint, {
+                    phase: Histogram(self.buckets) for phase in PHASES
+                })
+        return histograms
+
+    def record(self, endpoint: Optional[str], timings: Timings) -> None:
+        histograms = self.histograms(endpoint or "")
+        for phase, value in timings.phases():
+            histograms[phase].observe(value)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """endpoint -> phase -> {"buckets", "sum", "count"}."""
+        return {
+            endpoint: {
+                phase: histogram.snapshot()
+                for phase, histogram in histograms.items()
+            }
+            for endpoint, histograms in list(self._endpoints.items())
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self) -> str:
+        """The histograms in the prometheus text format."""
+        name = "schema_validator_phase_seconds"
+        lines = [
+            f"# HELP {name} The duration of the validation phases.",
+            f"# TYPE {name} histogram",
+        ]
+        for endpoint, histograms in list(self._endpoints.items()):
+            endpoint = _escape(endpoint)
+            for phase, histogram in histograms.items():
+                labels = f'endpoint="{endpoint}",phase="{phase}"'
+                counts, sum_, count = histogram.values()
+                for bound, bucket in zip(histogram.bounds, counts):
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {bucket}')
+                lines.append(
+                    f'{name}_bucket{{{labels},le="+Inf"}} {counts[-1]}')
+                lines.append(f"{name}_sum{{{labels}}} {sum_}")
+                lines.append(f"{name}_count{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
@@ -0,0 +1,58 @@
+import threading
+import weakref
+from typing import Any, Callable, Optional
+
+from schema_validator.constants import SCHEMA_PREPARATION_ATTRIBUTE
+
+_lock = threading.RLock()
+_pending: "weakref.WeakSet[Preparation]" = weakref.WeakSet()
+
+
+class Preparation:
+    """The deferred preparation of a view decorated with validate.
+
+    The models are converted and checked and the validation plan is
+    compiled on the first request of the view, or by prepare_all.
+    """
+
+    __slots__ = ("_prepare", "_result", "__weakref__")
+
+    def __init__(self, prepare: Callable[[], Any]) -> None:
+        self._prepare: Optional[Callable[[], Any]] = prepare
+        self._result: Any = None
+        _pending.add(self)
+
+    @property
+    def prepared(self) -> bool:
+        return self._prepare is None
+
+    def get(self) -> Any:
+        if self._prepare is not None:
+            with _lock:
+                if self._prepare is not None:
+                    self._result = self._prepare()
+                    self._prepare = None
+                    _pending.discard(self)
+        return self._result
+
+
+def pending() -> int:
+    """The number of views of every app of the process whose
+    preparation is pending.
+    """
+    return len(_pending)
+
+
+def prepare_all() -> int:
+    """Prepare the pending views, returns their number."""
+    preparations = list(_pending)
+    for preparation in preparations:
+        preparation.get()
+    return len(preparations)
+
+
+def prepare_view(view: Any) -> None:
+    """Prepare the view if it is decorated with validate."""
+    preparation = getattr(view, SCHEMA_PREPARATION_ATTRIBUTE, None)
+    if preparation is not None:
+        preparation.get()
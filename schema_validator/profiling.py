@@ -0,0 +1,138 @@
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from random import random
+from typing import Any, Dict, Iterable, Optional, Set, Union
+
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+class Capture:
+    """A running profile of a request."""
+
+    __slots__ = ("profile", "reason")
+
+    def __init__(self, profile: cProfile.Profile, reason: str) -> None:
+        self.profile = profile
+        self.reason = reason
+
+
+class Profiler:
+    """Profile requests through validate with cProfile.
+
+    A sample_rate fraction of the requests is profiled, and the next
+    request of an endpoint is profiled once one of its requests took more
+    than its slow_threshold seconds. One request is profiled at a time,
+    under quart the profile also covers the tasks run on the event loop
+    meanwhile and not the sync views run in executors.
+
+    Each profile is written to the directory as a pstats file with a json
+    sidecar of the endpoint, the models, the payload sizes and the
+    duration, only the max_profiles latest profiles are kept.
+
+        SchemaValidator(app, profiler=Profiler(
+            "/tmp/profiles", slow_threshold={"search": 0.5}))
+
+        python -m pstats /tmp/profiles/<file>.prof
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        slow_threshold: Union[None, float, Dict[str, float]] = None,
+        max_profiles: int = 100
+    ) -> None:
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        self._armed: Set[str] = set()
+        self._active = False
+
+    def threshold(self, endpoint: str) -> Optional[float]:
+        if isinstance(self.slow_threshold, dict):
+            return self.slow_threshold.get(endpoint)
+        return self.slow_threshold
+
+    def start(self, endpoint: Optional[str]) -> Optional[Capture]:
+        endpoint = endpoint or ""
+        if endpoint in self._armed:
+            reason = "slow"
+        elif self.sample_rate and random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+            self._armed.discard(endpoint)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active
+            self._active = False
+            return None
+        return Capture(profile, reason)
+
+    def finish(
+        self,
+        endpoint: Optional[str],
+        timings: Any,
+        models: Iterable[str] = ()
+    ) -> None:
+        endpoint = endpoint or ""
+        duration = timings.total()
+        capture = timings.capture
+        if capture is not None:
+            capture.profile.disable()
+            try:
+                self.save(capture, endpoint, duration, timings, models)
+            finally:
+                self._active = False
+        threshold = self.threshold(endpoint)
+        if threshold is not None and duration > threshold:
+            self._armed.add(endpoint)
+
+    def save(
+        self,
+        capture: Capture,
+        endpoint: str,
+        duration: float,
+        timings: Any,
+        models: Iterable[str]
+    ) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{time.time_ns()}-{_UNSAFE.sub('_', endpoint)}"
+        path = os.path.join(self.directory, f"{name}.prof")
+        capture.profile.dump_stats(path)
+        with open(os.path.join(self.directory, f"{name}.json"), "w") as f:
+            json.dump({
+                "endpoint": endpoint,
+                "reason": capture.reason,
+                "duration": duration,
+                "phases": dict(timings.phases()),
+                "models": list(models),
+                "request_bytes": timings.request_bytes,
+                "response_bytes": timings.response_bytes,
+            }, f)
+        self._rotate()
+        return path
+
+    def _rotate(self) -> None:
+        profiles = sorted(
+            name for name in os.listdir(self.directory)
+            if name.endswith(".prof")
+        )
+        for name in profiles[:max(len(profiles) - self.max_profiles, 0)]:
+            for path in (name, name[:-len(".prof")] + ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
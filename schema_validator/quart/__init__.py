@@ -1,7 +1,8 @@
-from .api import openapi, swagger_ui, convert_model_result
+from .api import metrics, openapi, swagger_ui, convert_model_result
 from .validation import validate
 
 __all__ = [
+    "metrics",
     "openapi",
     "swagger_ui",
     "validate",
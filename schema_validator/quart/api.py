@@ -5,7 +5,7 @@ from functools import wraps
 from dataclasses import is_dataclass, asdict
 from pydantic import BaseModel
 
-from quart import current_app, render_template_string
+from quart import Response, current_app, render_template_string, request
 
 from schema_validator.constants import SWAGGER_TEMPLATE
 
@@ -33,9 +33,16 @@ def convert_model_result(func: Callable) -> Callable:
     return decorator
 
 
-async def openapi(validator, tag: Optional[str] = None) -> dict:
-    from ..core import _build_openapi_schema
-    return _build_openapi_schema(current_app, validator, tag)
+async def openapi(validator, tag: Optional[str] = None) -> Response:
+    document, etag = validator.get_openapi_document(
+        current_app._get_current_object(), tag
+    )
+    if request.if_none_match.contains(etag):
+        response = Response(b"", status=304)
+    else:
+        response = Response(document, mimetype="application/json")
+    response.set_etag(etag)
+    return response
 
 
 async def swagger_ui(validator, tag: Optional[str] = None) -> str:
@@ -47,3 +54,10 @@ async def swagger_ui(validator, tag: Optional[str] = None) -> str:
         swagger_js_url=current_app.config["SCHEMA_SWAGGER_JS_URL"],
         swagger_css_url=current_app.config["SCHEMA_SWAGGER_CSS_URL"],
     )
+
+
+def metrics(validator) -> Response:
+    return Response(
+        validator.metrics.render(),
+        mimetype="text/plain; version=0.0.4"
+    )
@@ -1,23 +1,66 @@
-from dataclasses import asdict, is_dataclass
-from functools import wraps
-from typing import (Any, Callable, Dict, Iterable, List, Optional, Union, cast)
-
-from pydantic import BaseModel, ValidationError
-from pydantic.dataclasses import is_builtin_dataclass
-from quart import Response, current_app, g, jsonify, request
-from werkzeug.datastructures import Headers
-from werkzeug.exceptions import BadRequest
-
-from schema_validator.constants import (
-    SCHEMA_QUERYSTRING_ATTRIBUTE, SCHEMA_REQUEST_ATTRIBUTE,
-    SCHEMA_RESPONSE_ATTRIBUTE, SCHEMA_TAG_ATTRIBUTE
+import asyncio
+from concurrent.futures import Executor
+from contextvars import copy_context
+from functools import partial, wraps
+from random import random
+from time import perf_counter
+from collections.abc import AsyncIterator, Iterator
+from typing import (
+    Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Union
 )
+
+from pydantic import ValidationError
+from quart import Response, current_app, g, request
+from quart.wrappers.request import Body as RequestBody
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.exceptions import BadRequest, ServiceUnavailable
+
+from schema_validator.constants import SCHEMA_PREPARATION_ATTRIBUTE, \
+    SCHEMA_TAG_ATTRIBUTE
+from schema_validator.executor import ExecutorFullError, ObservedExecutor, \
+    observe
+from schema_validator.json_backend import JSONBackend, get_json_backend
+from schema_validator.metrics import Timings
+from schema_validator.preparation import Preparation
 from schema_validator.types import PydanticModel
-from schema_validator.utils import DataSource, check_body_schema, \
-    check_query_string_schema, check_response_schema
+from schema_validator.streaming import ResponseStream, body_stream, \
+    response_converter
+from schema_validator.utils import INHERIT, STREAM_SOURCES, \
+    BodyLimitError, BodyLimits, DataSource, HeaderParser, Inherit, \
+    ListBody, QueryStringParser, ValidationPlan, check_validation_rate, \
+    count_items, load_json_body, parse_json_body, parse_json_response, \
+    prepare_plan, render_validation_errors, response_to_dict, \
+    validate_json_body, validate_response
+
+
+def _json_response(
+    json_backend: JSONBackend,
+    object_: Any,
+    status: Optional[int] = None
+) -> Response:
+    return Response(
+        json_backend.dumps(object_), status=status,
+        mimetype="application/json"
+    )
+
+
+def _error_response(
+    extension: Any,
+    errors: Dict[str, Exception],
+    status: int = BadRequest.code
+) -> Response:
+    return _json_response(
+        get_json_backend(extension),
+        render_validation_errors(extension, errors),
+        status
+    )
 
 
-async def check_response(result, response_model: Dict[int, PydanticModel]):
+async def check_response(
+    result,
+    plan: ValidationPlan,
+    timings: Optional[Timings] = None
+):
     status_or_headers: Union[None, int, str, Dict, List] = None
     headers: Optional[Headers] = None
 
@@ -27,58 +70,283 @@ async def check_response(result, response_model: Dict[int, PydanticModel]):
     else:
         value = result
 
-    if isinstance(value, Response):
-        value = await value.get_json()
-
     status = 200
     if status_or_headers is not None and not isinstance(
         status_or_headers, (Headers, dict, list)
     ) and str(status_or_headers).isdigit():
         status = int(status_or_headers)
 
-    bad_status = BadRequest.code
-
-    for status_code, model_cls in response_model.items():
-        if status_code != status:
-            continue
-        if isinstance(value, dict):
-            try:
-                model_value = model_cls(**value)
-            except (TypeError, ValidationError) as ve:
-                return jsonify(validation_error=str(ve)), bad_status
-        elif type(value) == model_cls:
-            model_value = value
-        elif is_builtin_dataclass(value):
-            model_value = model_cls(**asdict(value))
-        else:
-            return jsonify(validation_error="invalid response"), bad_status
-        if is_dataclass(model_value):
-            return asdict(model_value), status_or_headers, headers
+    if status not in plan.responses:
+        return result
+
+    extension = current_app.extensions.get("SCHEMA_VALIDATOR")
+    json_backend = get_json_backend(extension)
+    rate = plan.validation_rate(extension)
+    sampled = rate >= 1.0 or random() < rate
+    if isinstance(value, (Iterator, AsyncIterator)):
+        convert = response_converter(
+            plan, status, extension, request.endpoint, sampled)
+        stream = ResponseStream(
+            value, convert, json_backend.dumps, plan.response_format)
+        return (
+            Response(stream.__aiter__(), mimetype=stream.mimetype),
+            status_or_headers,
+            headers
+        )
+    start = perf_counter()
+    if not sampled:
+        if isinstance(value, Response):
+            return result
+        model_value = response_to_dict(value)
+    else:
+        data = None
+        if isinstance(value, Response):
+            data = await value.get_data()
+            executor = _offload_executor(extension, data)
         else:
-            model_value = cast(BaseModel, model_value)
-            return model_value.dict(), status_or_headers, headers
-    return result
+            executor = _offload_value_executor(extension, value)
+        try:
+            if executor is None:
+                if data is not None:
+                    value = json_backend.loads(data)
+                model_value = plan.convert_response(status, value)
+            elif data is not None:
+                model_value = await executor.run(
+                    parse_json_response, json_backend,
+                    plan.responses[status], data
+                )
+            else:
+                model_value = await executor.run(
+                    validate_response, plan.responses[status], value)
+        except (TypeError, ValueError) as ve:
+            if extension is None or not extension.report_response_error(
+                request.endpoint, ve, rate
+            ):
+                return _error_response(extension, {"response": ve})
+            if data is not None:
+                return result
+            model_value = response_to_dict(value)
+    validated = perf_counter()
+    data = json_backend.dumps(model_value)
+    if timings is not None:
+        timings.response_validate = validated - start
+        timings.serialize = perf_counter() - validated
+        timings.response_bytes = len(data)
+    return (
+        Response(data, mimetype="application/json"),
+        status_or_headers,
+        headers
+    )
+
+
+def _offload_executor(
+    extension: Any,
+    data: Optional[bytes]
+) -> Optional[ObservedExecutor]:
+    """The executor validating the data if it is over the threshold."""
+    threshold = getattr(extension, "offload_threshold", None)
+    if threshold is None or data is None or len(data) < threshold:
+        return None
+    return extension.offload_executor
+
+
+def _offload_value_executor(
+    extension: Any,
+    value: Any
+) -> Optional[ObservedExecutor]:
+    """The executor validating the returned value if it has at least
+    offload_item_threshold fields and items.
+    """
+    threshold = getattr(extension, "offload_item_threshold", None)
+    if threshold is None or count_items(value, threshold) < threshold:
+        return None
+    return extension.offload_executor
+
+
+def _body_chunks(extension: Any, limits: BodyLimits) -> AsyncIterable[bytes]:
+    """The chunks of the request body, its size is checked against the
+    Content-Length before it is read and again as it is read.
+    """
+    limits.check_size(extension, request.content_length)
+    if limits.size_limit(extension) is None:
+        return request.body
+    return _counted_chunks(request.body, extension, limits)
+
+
+async def _counted_chunks(
+    chunks: AsyncIterable[bytes],
+    extension: Any,
+    limits: BodyLimits
+) -> AsyncIterable[bytes]:
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        limits.check_size(extension, size)
+        yield chunk
+
+
+async def _read_body(extension: Any, limits: BodyLimits) -> bytes:
+    if request.content_length is None:
+        return b"".join([
+            chunk async for chunk in _body_chunks(extension, limits)])
+    # the body is limited to the checked Content-Length
+    limits.check_size(extension, request.content_length)
+    return await request.get_data()
+
+
+async def _read_form(extension: Any, limits: BodyLimits) -> MultiDict:
+    data = await _read_body(extension, limits)
+    body = RequestBody(len(data), None)
+    body.set_result(data)
+    form, _ = await request.make_form_data_parser().parse(
+        body, request.mimetype, len(data), request.mimetype_params)
+    return form
+
+
+def _body_extractor(
+    body: Union[PydanticModel, ListBody],
+    source: DataSource,
+    max_body_errors: Union[None, int, Inherit],
+    limits: BodyLimits
+) -> Callable:
+    def _max_errors(extension: Any) -> Optional[int]:
+        if max_body_errors is INHERIT:
+            return getattr(extension, "max_body_errors", None)
+        return max_body_errors
+
+    if isinstance(body, ListBody) or source == DataSource.JSON:
+        async def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            start = perf_counter()
+            data = None
+            if request.is_json:
+                data = await _read_body(extension, limits)
+            json_backend = get_json_backend(extension)
+            if timings is not None:
+                timings.request_bytes = len(data or b"")
+            executor = _offload_executor(extension, data)
+            if executor is not None:
+                return await executor.run(
+                    parse_json_body, json_backend, body, data,
+                    limits.resolve(extension), _max_errors(extension)
+                )
+            value = load_json_body(
+                json_backend, data, limits.resolve(extension))
+            if timings is not None:
+                timings.parse = perf_counter() - start
+            return validate_json_body(body, value, _max_errors(extension))
+    elif source in STREAM_SOURCES:
+        async def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            return body_stream(
+                _body_chunks(extension, limits), body, source, extension,
+                _max_errors(extension)
+            )
+    else:
+        async def extract(extension: Any, timings: Optional[Timings]) -> Any:
+            return body(**await _read_form(extension, limits))
+    return extract
+
+
+def _headers_extractor(headers: PydanticModel) -> Callable:
+    parse = HeaderParser(headers).parse_headers
+
+    async def extract(extension: Any, timings: Optional[Timings]) -> Any:
+        return parse(request.headers)
+    return extract
+
+
+def _query_string_extractor(query_string: PydanticModel) -> Callable:
+    parse = QueryStringParser(query_string).parse
+
+    async def extract(extension: Any, timings: Optional[Timings]) -> Any:
+        return parse(request.args)
+    return extract
+
+
+def _view_tags(view: Callable) -> List[str]:
+    """The tags of the view and of the view class of the request."""
+    tags = list(getattr(view, SCHEMA_TAG_ATTRIBUTE, ()))
+    view_class = getattr(
+        current_app.view_functions.get(request.endpoint), "view_class", None)
+    if view_class is not None:
+        tags.extend(getattr(view_class, SCHEMA_TAG_ATTRIBUTE, ()))
+    return tags
+
+
+async def _run_sync(
+    extension: Any,
+    executor: Optional[ObservedExecutor],
+    view: Callable,
+    func: Callable,
+    args: tuple,
+    kwargs: dict
+) -> Any:
+    if executor is None and extension is not None:
+        executor = extension.get_view_executor(_view_tags(view))
+    if executor is None:
+        return await current_app.ensure_async(func)(*args, **kwargs)
+    try:
+        return await executor.run(
+            copy_context().run, partial(func, *args, **kwargs))
+    except ExecutorFullError as e:
+        raise ServiceUnavailable(str(e))
 
 
 def validate(
     query_string: Optional[PydanticModel] = None,
     body: Optional[PydanticModel] = None,
     source: DataSource = DataSource.JSON,
-    validate_path_args: bool = False,
+    validate_path_args: Union[bool, PydanticModel] = False,
     responses: Union[PydanticModel, Dict[int, PydanticModel], None] = None,
     headers: Optional[PydanticModel] = None,
-    tags: Optional[Iterable[str]] = None
+    tags: Optional[Iterable[str]] = None,
+    response_validation_rate: Optional[float] = None,
+    response_format: DataSource = DataSource.JSON_STREAM,
+    max_body_errors: Union[None, int, Inherit] = INHERIT,
+    max_body_size: Optional[int] = None,
+    max_body_depth: Optional[int] = None,
+    max_array_length: Optional[int] = None,
+    max_object_keys: Optional[int] = None,
+    view_executor: Union[None, int, Executor, ObservedExecutor] = None
 ) -> Callable:
     """
     params:
         query_string:
             the params in query
         body:
-            json body or form
+            json body or form, or List[Item] for a json list of items
         source:
-            the body source
+            the body source, g.body_params is a BodyStream of the
+            validated items for DataSource.NDJSON and JSON_STREAM
         response:
             response model define
+        validate_path_args:
+            True to validate the path arguments with the type annotations
+            of the view, or their model, the validated values are passed
+            to the view
+        headers:
+            the headers model, g.header_params, a field x_request_id
+            validates the X-Request-Id header
+        response_validation_rate:
+            the fraction of responses to validate, overrides the rate
+            of the SchemaValidator
+        response_format:
+            DataSource.JSON_STREAM or DataSource.NDJSON, how an iterator
+            returned by the view is validated and streamed item by item
+        max_body_errors:
+            for List[Item] bodies, stop validating after so many invalid
+            items, 1 to fail fast, None to validate all the items,
+            overrides the SchemaValidator setting by default
+        max_body_size, max_body_depth, max_array_length, max_object_keys:
+            limits of the body checked as it is read (413) and of the
+            parsed json before the model is built (400), override the
+            limits of the SchemaValidator
+        view_executor:
+            the executor, or number of worker threads, running the view if
+            it is sync, overrides the view executors of the SchemaValidator
+
+    The models are converted and checked, and the validation compiled,
+    on the first request of the view, on openapi generation or by
+    schema_validator.preparation.prepare_all().
 
     from dataclasses import dataclass
     from datetime import datetime
@@ -128,66 +396,98 @@ def validate(
             return {}
     """
 
-    # TODO
-    if validate_path_args:
-        pass
-    # TODO
-    if headers is not None:
-        pass
-
-    if query_string is not None:
-        query_string = check_query_string_schema(query_string)
-
-    if body is not None:
-        body = check_body_schema(body, source)
-
-    if responses is not None:
-        responses = check_response_schema(responses)
+    check_validation_rate(response_validation_rate)
+    limits = BodyLimits(
+        max_body_size, max_body_depth, max_array_length, max_object_keys)
+    executors: List[ObservedExecutor] = []
+
+    def get_executor(extension: Any) -> Optional[ObservedExecutor]:
+        """The view_executor, observed on the first request with the
+        view_max_queue of the extension.
+        """
+        if view_executor is None:
+            return None
+        if not executors:
+            executors.append(observe(
+                view_executor, getattr(extension, "view_max_queue", None)))
+        return executors[0]
 
     def decorator(func: Callable) -> Callable:
-
-        if query_string:
-            setattr(func, SCHEMA_QUERYSTRING_ATTRIBUTE, query_string)
-        if body:
-            setattr(func, SCHEMA_REQUEST_ATTRIBUTE, (body, source))
-        if responses:
-            setattr(func, SCHEMA_RESPONSE_ATTRIBUTE, responses)
         if tags:
             setattr(func, SCHEMA_TAG_ATTRIBUTE, list(set(tags)))
 
+        preparation = Preparation(lambda: prepare_plan(
+            func, query_string, body, source, validate_path_args,
+            responses, headers, response_validation_rate, response_format,
+            max_body_errors, limits, (func, wrapper), _body_extractor,
+            _query_string_extractor, _headers_extractor
+        ))
+        is_coroutine = asyncio.iscoroutinefunction(func)
+
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> Any:
-            err = {}
-            if body:
-                if source == DataSource.JSON:
-                    data = await request.get_json()
-                else:
-                    data = await request.form
+            plan = preparation.get()
+            extension = current_app.extensions.get("SCHEMA_VALIDATOR")
+            timings = None
+            if extension is not None:
+                timings = extension.start_timings(
+                    request.endpoint, request.headers)
+            try:
+                result = await validated_call(
+                    plan, extension, timings, args, kwargs)
+            finally:
+                if timings is not None:
+                    extension.record_timings(
+                        request.endpoint, timings, plan.model_names)
+            if timings is not None and timings.server_timing:
+                result = await current_app.make_response(result)
+                result.headers["Server-Timing"] = \
+                    timings.server_timing_header()
+            return result
 
+        async def validated_call(
+            plan: ValidationPlan,
+            extension: Any,
+            timings: Optional[Timings],
+            args: tuple,
+            kwargs: dict
+        ) -> Any:
+            start = perf_counter()
+            err = {}
+            if plan.path_args is not None:
                 try:
-                    body_model = body(**data)
-                except (TypeError, ValidationError) as ve:
-                    err["body_params"] = str(ve)
-                else:
-                    g.body_params = body_model
-
-            if query_string:
+                    kwargs.update(
+                        plan.path_args.parse(request.url_rule, kwargs))
+                except (TypeError, ValueError) as ve:
+                    err["path_params"] = ve
+            for name, extract in plan.extractors:
                 try:
-                    query_params = query_string(**request.args)
-                except (TypeError, ValidationError) as ve:
-                    err["query_params"] = str(ve)
-                else:
-                    g.query_params = query_params
+                    setattr(g, name, await extract(extension, timings))
+                except BodyLimitError as e:
+                    return _error_response(extension, {name: e}, e.status)
+                except (TypeError, ValueError) as ve:
+                    err[name] = ve
+            validated = perf_counter()
+            if timings is not None:
+                timings.validate = validated - start - (timings.parse or 0.0)
 
             if err:
-                return jsonify(validation_error=err), BadRequest.code
-
-            result = await current_app.ensure_async(func)(*args, **kwargs)
-
-            if responses:
-                return await check_response(result, responses)
+                return _error_response(extension, err)
+
+            if is_coroutine:
+                result = await func(*args, **kwargs)
+            else:
+                result = await _run_sync(
+                    extension, get_executor(extension), wrapper, func,
+                    args, kwargs)
+            if timings is not None:
+                timings.view = perf_counter() - validated
+
+            if plan.responses:
+                return await check_response(result, plan, timings)
             return result
 
+        setattr(wrapper, SCHEMA_PREPARATION_ATTRIBUTE, preparation)
         return wrapper
 
     return decorator
@@ -0,0 +1,352 @@
+import codecs
+import json
+import re
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator,
+    List, Optional, Tuple
+)
+
+from schema_validator.casing import decamelize_keys
+from schema_validator.json_backend import get_json_backend
+from schema_validator.types import PydanticModel
+from schema_validator.utils import DataSource, ValidationPlan, \
+    format_errors, response_to_dict
+
+CHUNK_SIZE = 64 * 1024
+# the default maximum size of a line or of an item of a streamed body
+MAX_ITEM_SIZE = 1024 * 1024
+# a decoding error further than so many characters from the end of the
+# buffer is not caused by an item continuing in the next chunk
+_TRUNCATION_WINDOW = 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class NDJSONParser:
+    """Split the chunks of a NDJSON body into (line number, item).
+
+    Only the current line is buffered, a line longer than max_item_size
+    bytes ends the body.
+    """
+
+    def __init__(
+        self,
+        loads: Callable[[bytes], Any],
+        max_item_size: Optional[int] = MAX_ITEM_SIZE
+    ) -> None:
+        self.loads = loads
+        self.max_item_size = max_item_size
+        self.line = 0
+        self.buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[int, Any]]:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            if self.buffer:
+                self.buffer += chunk[start:end]
+                line = bytes(self.buffer)
+                self.buffer.clear()
+            else:
+                line = chunk[start:end]
+            self._check_size(len(line))
+            yield from self._parse(line)
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        self.buffer += chunk[start:]
+        self._check_size(len(self.buffer))
+
+    def close(self) -> Iterator[Tuple[int, Any]]:
+        line = bytes(self.buffer)
+        self.buffer.clear()
+        yield from self._parse(line)
+
+    def _check_size(self, size: int) -> None:
+        if self.max_item_size is not None and size > self.max_item_size:
+            raise ValueError(
+                f"line {self.line + 1} exceeds {self.max_item_size} bytes")
+
+    def _parse(self, line: bytes) -> Iterator[Tuple[int, Any]]:
+        self.line += 1
+        if not line.strip():
+            return
+        try:
+            yield self.line, self.loads(line)
+        except ValueError as e:
+            yield self.line, e
+
+
+class JSONArrayParser:
+    """Split the chunks of a JSON array body into (index, item).
+
+    Only the current item is buffered, an item longer than max_item_size
+    characters ends the body, as does an invalid item.
+    """
+
+    def __init__(
+        self,
+        convert_casing: bool = False,
+        max_item_size: Optional[int] = MAX_ITEM_SIZE
+    ) -> None:
+        self.max_item_size = max_item_size
+        if convert_casing:
+            self.decoder = json.JSONDecoder(object_hook=decamelize_keys)
+        else:
+            self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.index = 0
+        self.started = False
+        self.finished = False
+        self.expect_item = False
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[int, Any]]:
+        self.buffer += self.text.decode(chunk)
+        yield from self._parse(final=False)
+
+    def close(self) -> Iterator[Tuple[int, Any]]:
+        self.buffer += self.text.decode(b"", final=True)
+        yield from self._parse(final=True)
+        if not self.finished:
+            raise ValueError("Unterminated JSON array")
+
+    def _parse(self, final: bool) -> Iterator[Tuple[int, Any]]:
+        buffer = self.buffer
+        pos = _WHITESPACE.match(buffer).end()
+        if not self.started:
+            if pos == len(buffer):
+                self.buffer = ""
+                return
+            if buffer[pos] != "[":
+                raise ValueError("Expecting a JSON array")
+            self.started = True
+            pos = _WHITESPACE.match(buffer, pos + 1).end()
+            self.expect_item = True
+
+        while pos < len(buffer) and not self.finished:
+            char = buffer[pos]
+            if char == "]":
+                if self.expect_item and self.index:
+                    raise ValueError(
+                        f"Invalid JSON array at item {self.index}")
+                self.finished = True
+                pos += 1
+                break
+            if (char == ",") != (not self.expect_item):
+                raise ValueError(f"Invalid JSON array at item {self.index}")
+            if char == ",":
+                self.expect_item = True
+                pos = _WHITESPACE.match(buffer, pos + 1).end()
+                continue
+            try:
+                item, end = self.decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if final or not _truncated(e, len(buffer)):
+                    raise
+                break
+            # a number at the end of the buffer may continue in the
+            # next chunk
+            if end == len(buffer) and not final:
+                break
+            self._check_size(end - pos)
+            yield self.index, item
+            self.index += 1
+            self.expect_item = False
+            pos = _WHITESPACE.match(buffer, end).end()
+        self.buffer = buffer[pos:]
+        self._check_size(len(self.buffer))
+
+    def _check_size(self, size: int) -> None:
+        if self.max_item_size is not None and size > self.max_item_size:
+            raise ValueError(
+                f"item {self.index} exceeds {self.max_item_size} bytes")
+
+
+def _truncated(error: json.JSONDecodeError, length: int) -> bool:
+    """Whether the decoding error may be caused by the end of the buffer
+    rather than by an invalid item.
+    """
+    return (
+        error.msg.startswith("Unterminated string")
+        or length - error.pos <= _TRUNCATION_WINDOW
+    )
+
+
+class BodyStream:
+    """The validated items of a NDJSON or JSON array request body.
+
+    Iterate it (or async iterate it under quart) to read, parse and
+    validate the body item by item. The items failing validation are
+    skipped, the first max_errors of them are collected in errors as
+    (line number or index, errors as ``ve.errors()`` returns them, at
+    most error_limit) and the others are counted in omitted_errors.
+
+        @app.post("/")
+        @validate(body=Item, source=DataSource.NDJSON)
+        def upload():
+            for item in g.body_params:
+                ...
+            return {"errors": g.body_params.errors}
+    """
+
+    def __init__(
+        self,
+        chunks: Any,
+        model: PydanticModel,
+        parser: Any,
+        max_errors: Optional[int] = None,
+        error_limit: Optional[int] = None
+    ) -> None:
+        self.chunks = chunks
+        self.model = model
+        self.parser = parser
+        self.max_errors = max_errors
+        self.error_limit = error_limit
+        self.errors: List[Tuple[int, List[Dict[str, Any]]]] = []
+        self.omitted_errors = 0
+
+    def _error(self, number: int, error: Exception) -> None:
+        if self.max_errors is not None and \
+                len(self.errors) >= self.max_errors:
+            self.omitted_errors += 1
+        else:
+            self.errors.append(
+                (number, format_errors(error, self.error_limit)))
+
+    def _validate(self, items: Iterable[Tuple[int, Any]]) -> Iterator[Any]:
+        for number, data in items:
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                model = self.model(**data)
+            except (TypeError, ValueError) as e:
+                self._error(number, e)
+            else:
+                yield model
+
+    def _parse_error(self, error: ValueError) -> None:
+        number = getattr(self.parser, "index", None)
+        if number is None:
+            number = self.parser.line
+        self._error(number, error)
+
+    def __iter__(self) -> Iterator[Any]:
+        chunks: Iterable[bytes] = self.chunks
+        try:
+            for chunk in chunks:
+                yield from self._validate(self.parser.feed(chunk))
+            yield from self._validate(self.parser.close())
+        except ValueError as e:
+            self._parse_error(e)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        chunks: AsyncIterable[bytes] = self.chunks
+        try:
+            async for chunk in chunks:
+                for item in self._validate(self.parser.feed(chunk)):
+                    yield item
+            for item in self._validate(self.parser.close()):
+                yield item
+        except ValueError as e:
+            self._parse_error(e)
+
+
+def body_stream(
+    chunks: Any,
+    model: PydanticModel,
+    source: DataSource,
+    extension: Any,
+    max_errors: Optional[int] = None
+) -> BodyStream:
+    max_item_size = getattr(extension, "max_stream_item_size", MAX_ITEM_SIZE)
+    if source == DataSource.NDJSON:
+        parser: Any = NDJSONParser(
+            get_json_backend(extension).loads, max_item_size)
+    else:
+        parser = JSONArrayParser(
+            getattr(extension, "convert_casing", False), max_item_size)
+    return BodyStream(
+        chunks, model, parser, max_errors,
+        getattr(extension, "max_validation_errors", None)
+    )
+
+
+class ResponseStream:
+    """Validate and serialize the items of a streamed response one by
+    one, as a JSON array or as NDJSON.
+    """
+
+    def __init__(
+        self,
+        items: Any,
+        convert: Callable[[Any], Any],
+        dumps: Callable[[Any], bytes],
+        response_format: DataSource = DataSource.JSON_STREAM
+    ) -> None:
+        self.items = items
+        self.convert = convert
+        self.dumps = dumps
+        self.ndjson = response_format == DataSource.NDJSON
+        self.count = 0
+
+    @property
+    def mimetype(self) -> str:
+        if self.ndjson:
+            return "application/x-ndjson"
+        return "application/json"
+
+    def _encode(self, item: Any) -> bytes:
+        data = self.dumps(self.convert(item))
+        if self.ndjson:
+            return data + b"\n"
+        if self.count:
+            data = b"," + data
+        self.count += 1
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        if not self.ndjson:
+            yield b"["
+        for item in self.items:
+            yield self._encode(item)
+        if not self.ndjson:
+            yield b"]"
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if not self.ndjson:
+            yield b"["
+        if hasattr(self.items, "__aiter__"):
+            async for item in self.items:
+                yield self._encode(item)
+        else:
+            for item in self.items:
+                yield self._encode(item)
+        if not self.ndjson:
+            yield b"]"
+
+
+def response_converter(
+    plan: ValidationPlan,
+    status: int,
+    extension: Any,
+    endpoint: Optional[str],
+    validate: bool
+) -> Callable[[Any], Any]:
+    """Convert the streamed items, the failures are reported to the
+    extension and end the stream if they are not handled.
+    """
+    if not validate:
+        return response_to_dict
+    rate = plan.validation_rate(extension)
+
+    def convert(item: Any) -> Any:
+        try:
+            return plan.convert_response(status, item)
+        except (TypeError, ValueError) as e:
+            if extension is None or not extension.report_response_error(
+                endpoint, e, rate
+            ):
+                raise
+            return response_to_dict(item)
+
+    return convert
@@ -1,34 +1,45 @@
-from typing import Dict, List, Optional, Tuple, Type, TypedDict, Union
+from typing import (
+    Any, Dict, List, Optional, Tuple, Type, TypedDict, Union
+)
 from dataclasses import dataclass
 
 from pydantic import BaseModel
 
-try:
-    from flask.typing import (
-        HeadersValue,
-        ResponseReturnValue as FlaskResponseReturnValue,
-        ResponseValue as FlaskResponseValue,
-        StatusCode,
-    )
-except ImportError:
-    from quart.typing import (
-        HeadersValue,
-        ResponseReturnValue as FlaskResponseReturnValue,
-        ResponseValue as FlaskResponseValue,
-        StatusCode,
-    )
-
 PydanticModel = Union[Type[BaseModel], Type]
 
-ResponseValue = Union[FlaskResponseValue, PydanticModel]
 
-ResponseReturnValue = Union[
-    FlaskResponseReturnValue,
-    ResponseValue,
-    Tuple[ResponseValue, HeadersValue],
-    Tuple[ResponseValue, StatusCode],
-    Tuple[ResponseValue, StatusCode, HeadersValue],
-]
+def __getattr__(name: str) -> Any:
+    # the response types of the framework are built on first access, so
+    # that importing this module does not import flask or quart
+    if name not in ("ResponseValue", "ResponseReturnValue"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        from flask.typing import (
+            HeadersValue,
+            ResponseReturnValue as FlaskResponseReturnValue,
+            ResponseValue as FlaskResponseValue,
+            StatusCode,
+        )
+    except ImportError:
+        from quart.typing import (
+            HeadersValue,
+            ResponseReturnValue as FlaskResponseReturnValue,
+            ResponseValue as FlaskResponseValue,
+            StatusCode,
+        )
+
+    response_value = Union[FlaskResponseValue, PydanticModel]
+    globals().update(
+        ResponseValue=response_value,
+        ResponseReturnValue=Union[
+            FlaskResponseReturnValue,
+            response_value,
+            Tuple[response_value, HeadersValue],
+            Tuple[response_value, StatusCode],
+            Tuple[response_value, StatusCode, HeadersValue],
+        ]
+    )
+    return globals()[name]
 
 
 class VariableObject(TypedDict, total=False):
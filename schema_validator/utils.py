@@ -1,11 +1,29 @@
+from dataclasses import asdict, is_dataclass
 from enum import Enum, auto
-from typing import Callable, Dict, Iterable, Union
+from inspect import Parameter, signature
+from itertools import islice
+from uuid import UUID
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Tuple, Union,
+    get_type_hints
+)
 
+from pydantic import BaseModel, ValidationError, create_model
+from pydantic.error_wrappers import ErrorWrapper, flatten_errors
+from pydantic.fields import SHAPE_DEFAULTDICT, SHAPE_DEQUE, SHAPE_DICT, \
+    SHAPE_FROZENSET, SHAPE_ITERABLE, SHAPE_LIST, SHAPE_MAPPING, \
+    SHAPE_SEQUENCE, SHAPE_SET, SHAPE_SINGLETON, SHAPE_TUPLE_ELLIPSIS
 from pydantic.dataclasses import dataclass as pydantic_dataclass, \
     is_builtin_dataclass
-from pydantic.schema import model_schema
+from werkzeug.routing import AnyConverter, FloatConverter, \
+    IntegerConverter, PathConverter, UnicodeConverter, UUIDConverter
 
-from schema_validator.constants import SCHEMA_TAG_ATTRIBUTE
+from schema_validator.casing import register_model
+from schema_validator.constants import (
+    SCHEMA_HEADERS_ATTRIBUTE, SCHEMA_PATH_ATTRIBUTE,
+    SCHEMA_QUERYSTRING_ATTRIBUTE, SCHEMA_REQUEST_ATTRIBUTE,
+    SCHEMA_RESPONSE_ATTRIBUTE, SCHEMA_TAG_ATTRIBUTE
+)
 from schema_validator.types import PydanticModel
 
 
@@ -13,9 +31,341 @@ class SchemaInvalidError(Exception):
     pass
 
 
+class BodyLimitError(ValueError):
+    """The request body exceeds a limit of the endpoint."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class BodyLimits:
+    """The size and shape limits of the request body of an endpoint.
+
+    None falls back to the limit of the extension, the size is checked
+    against the Content-Length before the body is read and as it is
+    read, the shape on the parsed json before the model is built.
+    """
+
+    __slots__ = (
+        "max_body_size", "max_body_depth", "max_array_length",
+        "max_object_keys"
+    )
+
+    def __init__(
+        self,
+        max_body_size: Optional[int] = None,
+        max_body_depth: Optional[int] = None,
+        max_array_length: Optional[int] = None,
+        max_object_keys: Optional[int] = None
+    ) -> None:
+        self.max_body_size = max_body_size
+        self.max_body_depth = max_body_depth
+        self.max_array_length = max_array_length
+        self.max_object_keys = max_object_keys
+
+    def _limit(self, name: str, extension: Any) -> Optional[int]:
+        limit = getattr(self, name)
+        if limit is None:
+            limit = getattr(extension, name, None)
+        return limit
+
+    def resolve(self, extension: Any) -> "BodyLimits":
+        """The limits with the fallbacks of the extension applied."""
+        return BodyLimits(*(
+            self._limit(name, extension) for name in self.__slots__
+        ))
+
+    def size_limit(self, extension: Any) -> Optional[int]:
+        return self._limit("max_body_size", extension)
+
+    def check_size(self, extension: Any, size: Optional[int]) -> None:
+        limit = self.size_limit(extension)
+        if limit is not None and size is not None and size > limit:
+            raise BodyLimitError(
+                f"the body exceeds {limit} bytes", status=413)
+
+    def check_shape(self, extension: Any, data: Any) -> None:
+        """Walk the parsed json depth by depth for its nesting depth and
+        for the items of its arrays and the keys of its objects, before
+        any model is built from it.
+        """
+        max_depth = self._limit("max_body_depth", extension)
+        max_items = self._limit("max_array_length", extension)
+        max_keys = self._limit("max_object_keys", extension)
+        if max_depth is None and max_items is None and max_keys is None:
+            return
+
+        # the containers of each depth in turn
+        level = [data] if isinstance(data, (dict, list)) else []
+        depth = 0
+        while level:
+            depth += 1
+            if max_depth is not None and depth > max_depth:
+                raise BodyLimitError(f"the body exceeds depth {max_depth}")
+            children: List[Any] = []
+            for value in level:
+                if isinstance(value, dict):
+                    if max_keys is not None and len(value) > max_keys:
+                        raise BodyLimitError(
+                            f"an object exceeds {max_keys} keys")
+                    value = value.values()
+                elif max_items is not None and len(value) > max_items:
+                    raise BodyLimitError(
+                        f"an array exceeds {max_items} items")
+                children.extend([
+                    child for child in value
+                    if isinstance(child, (dict, list))
+                ])
+            level = children
+
+
 class DataSource(Enum):
     FORM = auto()
     JSON = auto()
+    # streamed bodies, validated item by item
+    NDJSON = auto()
+    JSON_STREAM = auto()
+
+
+class Inherit(Enum):
+    """The default of the settings of validate which are inherited from
+    the SchemaValidator, when None has a meaning of its own.
+    """
+    INHERIT = auto()
+
+
+INHERIT = Inherit.INHERIT
+
+STREAM_SOURCES = (DataSource.NDJSON, DataSource.JSON_STREAM)
+
+
+_LIST_SHAPES = {
+    SHAPE_LIST, SHAPE_SET, SHAPE_FROZENSET, SHAPE_SEQUENCE,
+    SHAPE_TUPLE_ELLIPSIS, SHAPE_DEQUE, SHAPE_ITERABLE
+}
+_BOOLS = {
+    "0": False, "off": False, "f": False, "false": False, "n": False,
+    "no": False, "1": True, "on": True, "t": True, "true": True, "y": True,
+    "yes": True,
+}
+
+
+def _bool_coercer(value: str) -> Any:
+    return _BOOLS.get(value.lower(), value)
+
+
+def _enum_coercer(enum: Any) -> Callable[[str], Any]:
+    members = {str(member.value): member for member in enum}
+    return lambda value: members.get(value, value)
+
+
+def _coercer(type_: Any) -> Optional[Callable[[str], Any]]:
+    if not isinstance(type_, type):
+        return None
+    if issubclass(type_, Enum):
+        return _enum_coercer(type_)
+    if issubclass(type_, bool):
+        return _bool_coercer
+    if issubclass(type_, (int, float)):
+        return type_
+    return None
+
+
+class QueryStringParser:
+    """The parser of a query string model, compiled once per model.
+
+    Only the declared fields are read, list fields with getlist, and
+    the values are coerced to int, float, bool and enum fields before
+    the model validates them. A value which can not be coerced is left
+    to the model to report.
+    """
+
+    __slots__ = ("model", "fields")
+
+    def __init__(self, model: PydanticModel) -> None:
+        self.model = model
+        self.fields = tuple(
+            (
+                field.alias,
+                field.shape in _LIST_SHAPES,
+                _coercer(field.type_)
+            )
+            for field in model.__fields__.values()
+        )
+
+    def parse(self, args: Any) -> Any:
+        values = {}
+        for key, is_list, coerce in self.fields:
+            if is_list:
+                raw = args.getlist(key)
+                if not raw:
+                    continue
+                if coerce is not None:
+                    raw = [_coerce(coerce, value) for value in raw]
+            else:
+                raw = args.get(key)
+                if raw is None:
+                    continue
+                if coerce is not None:
+                    raw = _coerce(coerce, raw)
+            values[key] = raw
+        return self.model(**values)
+
+
+def _coerce(coerce: Callable[[str], Any], value: str) -> Any:
+    try:
+        return coerce(value)
+    except ValueError:
+        return value
+
+
+_ENVIRON_HEADERS = {"content-type", "content-length"}
+
+
+def header_name(alias: str) -> str:
+    """The lower case name of the header of a field."""
+    return alias.replace("_", "-").lower()
+
+
+class HeaderParser:
+    """The parser of a headers model, compiled once per model.
+
+    Only the declared headers are read, from the WSGI environ under
+    flask or in one pass over the headers under quart.
+    """
+
+    __slots__ = ("model", "environ_keys", "names")
+
+    def __init__(self, model: PydanticModel) -> None:
+        self.model = model
+        self.environ_keys = []
+        self.names = {}
+        for field in model.__fields__.values():
+            name = header_name(field.alias)
+            key = name.upper().replace("-", "_")
+            if name not in _ENVIRON_HEADERS:
+                key = f"HTTP_{key}"
+            self.environ_keys.append((field.alias, key))
+            self.names[name] = field.alias
+            self.names[name.title()] = field.alias
+
+    def parse_environ(self, environ: Dict[str, Any]) -> Any:
+        values = {}
+        for alias, key in self.environ_keys:
+            value = environ.get(key)
+            if value is not None:
+                values[alias] = value
+        return self.model(**values)
+
+    def parse_headers(self, headers: Iterable[Tuple[str, str]]) -> Any:
+        names = self.names
+        values = {}
+        for key, value in headers:
+            alias = names.get(key)
+            if alias is None:
+                alias = names.get(key.lower())
+            if alias is not None and alias not in values:
+                values[alias] = value
+        return self.model(**values)
+
+
+def check_headers_schema(headers: PydanticModel) -> PydanticModel:
+    if is_builtin_dataclass(headers):
+        headers = pydantic_dataclass(headers).__pydantic_model__
+    return headers
+
+
+# the types guaranteed by the werkzeug converters
+CONVERTER_TYPES = {
+    IntegerConverter: int,
+    FloatConverter: float,
+    UUIDConverter: UUID,
+    UnicodeConverter: str,
+    PathConverter: str,
+    AnyConverter: str,
+}
+
+
+def converter_type(converter: Any) -> Any:
+    for converter_class in type(converter).__mro__:
+        type_ = CONVERTER_TYPES.get(converter_class)
+        if type_ is not None:
+            return type_
+    return str
+
+
+class PathArgsParser:
+    """The parser of the path arguments of a view.
+
+    The fields to validate are computed once per url rule from its
+    converters, a field whose type the converter already guarantees is
+    not validated again.
+    """
+
+    __slots__ = ("model", "_fields")
+
+    def __init__(self, model: PydanticModel) -> None:
+        self.model = model
+        self._fields: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+
+    def fields(self, rule: Any) -> Tuple[Tuple[str, Any], ...]:
+        fields = self._fields.get(rule.rule)
+        if fields is None:
+            model_fields = {
+                field.alias: field
+                for field in self.model.__fields__.values()
+            }
+            fields = tuple(
+                (name, model_fields[name])
+                for name, converter in rule._converters.items()
+                if name in model_fields and
+                model_fields[name].outer_type_ is not
+                converter_type(converter)
+            )
+            self._fields[rule.rule] = fields
+        return fields
+
+    def parse(self, rule: Any, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """The validated path arguments which are not guaranteed by the
+        converters of the rule.
+        """
+        values = {}
+        errors = []
+        for name, field in self.fields(rule):
+            if name not in kwargs:
+                continue
+            value, error = field.validate(
+                kwargs[name], values, loc=name, cls=self.model)
+            if error:
+                errors.append(error)
+            else:
+                values[name] = value
+        if errors:
+            raise ValidationError(errors, self.model)
+        return values
+
+
+def check_path_args_schema(
+    path_args: Union[bool, PydanticModel],
+    func: Callable
+) -> PydanticModel:
+    """The model of the path arguments, made of the type annotations of
+    the view if path_args is True.
+    """
+    if path_args is not True:
+        if is_builtin_dataclass(path_args):
+            path_args = pydantic_dataclass(path_args).__pydantic_model__
+        return path_args
+    hints = get_type_hints(func)
+    fields = {}
+    for name, parameter in signature(func).parameters.items():
+        if name in hints:
+            default = parameter.default
+            if default is Parameter.empty:
+                default = ...
+            fields[name] = (hints[name], default)
+    return create_model(f"{func.__name__}PathArgs", **fields)
 
 
 def check_query_string_schema(query_string: PydanticModel) -> PydanticModel:
@@ -24,22 +374,77 @@ def check_query_string_schema(query_string: PydanticModel) -> PydanticModel:
     return query_string
 
 
+class ListBody:
+    """The compiled validator of a List[Item] body.
+
+    The items are validated one by one, parsing stops once max_errors
+    items failed, None to validate all of them, the raised
+    ValidationError locates the errors by the index of the item.
+    """
+
+    def __init__(self, item_type: Any) -> None:
+        if is_builtin_dataclass(item_type):
+            item_type = pydantic_dataclass(item_type).__pydantic_model__
+        self.item_type = item_type
+        if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+            self.item_model = item_type
+            self.is_root = False
+        else:
+            self.item_model = create_model(
+                "ListBodyItem", __root__=(item_type, ...))
+            self.is_root = True
+
+    def parse(self, data: Any, max_errors: Optional[int] = None) -> list:
+        if not isinstance(data, list):
+            raise TypeError("the body must be a list")
+
+        parse_obj = self.item_model.parse_obj
+        items = []
+        errors = []
+        for index, item in enumerate(data):
+            try:
+                value = parse_obj(item)
+            except ValidationError as ve:
+                errors.append(ErrorWrapper(ve, loc=index))
+                if max_errors is not None and len(errors) >= max_errors:
+                    break
+            else:
+                items.append(value.__root__ if self.is_root else value)
+        if errors:
+            raise ValidationError(errors, self.item_model)
+        return items
+
+
 def check_body_schema(
     body: PydanticModel,
     source: DataSource
-) -> PydanticModel:
+) -> Union[PydanticModel, ListBody]:
+    if getattr(body, "__origin__", None) is list:
+        if source != DataSource.JSON:
+            raise SchemaInvalidError("List body must be sent as JSON")
+        item_type, = getattr(body, "__args__", None) or (Any,)
+        return ListBody(item_type)
+
     if is_builtin_dataclass(body):
         body = pydantic_dataclass(body).__pydantic_model__
 
-    schema = model_schema(body)
     if source == DataSource.FORM and any(
-        schema["properties"][field]["type"] == "object" for field in
-            schema["properties"]
+        _is_nested(field) for field in body.__fields__.values()
     ):
         raise SchemaInvalidError("Form must not have nested objects")
     return body
 
 
+def _is_nested(field: Any) -> bool:
+    """Whether the field is an object, lists of objects are accepted."""
+    if field.shape in (SHAPE_MAPPING, SHAPE_DICT, SHAPE_DEFAULTDICT):
+        return True
+    type_ = field.type_
+    return field.shape == SHAPE_SINGLETON and isinstance(type_, type) and (
+        issubclass(type_, (BaseModel, dict)) or is_dataclass(type_)
+    )
+
+
 def check_response_schema(
     responses: Union[PydanticModel, Dict]
 ) -> Dict[int, PydanticModel]:
@@ -59,6 +464,317 @@ def check_response_schema(
     return responses
 
 
+def check_validation_rate(rate: Optional[float]) -> Optional[float]:
+    if rate is not None and not 0.0 <= rate <= 1.0:
+        raise ValueError(
+            f"invalid response_validation_rate: {rate}, must be in [0, 1]")
+    return rate
+
+
+def format_errors(
+    error: Exception,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """The errors of the exception as ``ve.errors()`` does, at most
+    ``limit`` errors are formatted, the last of which is replaced by a
+    truncation marker when there are more.
+    """
+    if isinstance(error, ValidationError):
+        model = error.model
+        config = getattr(model, "__config__", None) or \
+            model.__pydantic_model__.__config__
+        errors: Iterable[Dict[str, Any]] = flatten_errors(
+            error.raw_errors, config)
+    else:
+        type_ = "type_error" if isinstance(error, TypeError) else \
+            "value_error"
+        errors = [{"loc": (), "msg": str(error), "type": type_}]
+
+    if limit is None:
+        return list(errors)
+    result = list(islice(errors, limit + 1))
+    if len(result) > limit:
+        del result[max(limit - 1, 0):]
+        if limit > 0:
+            result.append({
+                "loc": (), "msg": "more errors omitted",
+                "type": "value_error.truncated"
+            })
+    return result
+
+
+def render_errors(errors: Dict[str, List[Dict[str, Any]]]) -> Any:
+    """The default error renderer, errors: location -> errors."""
+    return {"validation_error": errors}
+
+
+def render_validation_errors(
+    extension: Any,
+    errors: Dict[str, Exception]
+) -> Any:
+    """Render the errors by location with the renderer of the extension."""
+    limit = getattr(extension, "max_validation_errors", None)
+    renderer = getattr(extension, "error_renderer", None) or render_errors
+    return renderer({
+        location: format_errors(error, limit)
+        for location, error in errors.items()
+    })
+
+
+def _from_dict(model_cls: PydanticModel, value: dict) -> Any:
+    return model_cls(**value)
+
+
+def _from_model(model_cls: PydanticModel, value: Any) -> Any:
+    return value
+
+
+def _from_dataclass(model_cls: PydanticModel, value: Any) -> Any:
+    return model_cls(**asdict(value))
+
+
+def _model_to_dict(model_value: Any) -> dict:
+    if is_dataclass(model_value):
+        return asdict(model_value)
+    return model_value.dict()
+
+
+def validate_response(model_cls: PydanticModel, value: Any) -> dict:
+    """Validate a returned dict, model or dataclass against the model,
+    the uncached ValidationPlan.convert_response run by the executors.
+    """
+    if type(value) is model_cls:
+        convert = _from_model
+    elif isinstance(value, dict):
+        convert = _from_dict
+    elif is_builtin_dataclass(value):
+        convert = _from_dataclass
+    else:
+        raise TypeError("invalid response")
+    return _model_to_dict(convert(model_cls, value))
+
+
+def count_items(value: Any, limit: int) -> int:
+    """The number of fields and items of the value and of its nested
+    dicts, lists, models and dataclasses, counted until limit is reached.
+    """
+    count = 0
+    stack = [value]
+    while stack and count < limit:
+        value = stack.pop()
+        if isinstance(value, BaseModel) or (
+            is_dataclass(value) and not isinstance(value, type)
+        ):
+            value = value.__dict__
+        if isinstance(value, dict):
+            children: Iterable = value.values()
+        elif isinstance(value, (list, tuple)):
+            children = value
+        else:
+            continue
+        count += len(value)
+        stack.extend(islice(children, max(limit - count, 0) + 1))
+    return count
+
+
+def response_to_dict(value: Any) -> Any:
+    """Serialize a returned model without validating it."""
+    if isinstance(value, BaseModel) or (
+        is_dataclass(value) and not isinstance(value, type)
+    ):
+        return _model_to_dict(value)
+    return value
+
+
+def parse_json_body(
+    json_backend: Any,
+    body: Union[PydanticModel, ListBody],
+    data: Optional[bytes],
+    limits: BodyLimits,
+    max_errors: Optional[int] = None
+) -> Any:
+    """Parse and validate a json body against resolved limits.
+
+    A module level function so that it can run in a process pool.
+    """
+    return validate_json_body(
+        body, load_json_body(json_backend, data, limits), max_errors)
+
+
+def load_json_body(
+    json_backend: Any,
+    data: Optional[bytes],
+    limits: BodyLimits
+) -> Any:
+    if data is None:
+        return None
+    try:
+        value = json_backend.loads(data)
+    except RecursionError:
+        raise BodyLimitError("the body is too deeply nested")
+    limits.check_shape(None, value)
+    return value
+
+
+def validate_json_body(
+    body: Union[PydanticModel, ListBody],
+    value: Any,
+    max_errors: Optional[int] = None
+) -> Any:
+    if isinstance(body, ListBody):
+        return body.parse(value, max_errors)
+    return body(**value)
+
+
+def parse_json_response(
+    json_backend: Any,
+    model_cls: PydanticModel,
+    data: bytes
+) -> dict:
+    """Parse and validate a json response, see parse_json_body."""
+    value = json_backend.loads(data)
+    if not isinstance(value, dict):
+        raise TypeError("invalid response")
+    return _model_to_dict(model_cls(**value))
+
+
+class ValidationPlan:
+    """The per endpoint validation steps, compiled once by ``validate``.
+
+    extractors: (name, callable) pairs, each callable is called with the
+        extension and the Timings of the request, or None, its result is
+        stored on ``g`` under the name.
+    responses: status code -> response model.
+    response_validation_rate: the fraction of responses to validate,
+        None to use the rate of the extension.
+    response_format: how returned iterators are streamed,
+        DataSource.JSON_STREAM or DataSource.NDJSON.
+    path_args: the PathArgsParser of the path arguments, or None.
+    model_names: the names of the models, to tag profiles.
+    """
+
+    __slots__ = (
+        "extractors", "responses", "response_validation_rate",
+        "response_format", "path_args", "model_names", "_converters"
+    )
+
+    def __init__(
+        self,
+        extractors: Iterable[Tuple[str, Callable]],
+        responses: Optional[Dict[int, PydanticModel]] = None,
+        response_validation_rate: Optional[float] = None,
+        response_format: DataSource = DataSource.JSON_STREAM,
+        path_args: Optional[PathArgsParser] = None,
+        model_names: Iterable[str] = ()
+    ) -> None:
+        set_ = object.__setattr__
+        set_(self, "extractors", tuple(extractors))
+        set_(self, "responses", dict(responses or {}))
+        set_(self, "response_validation_rate", response_validation_rate)
+        set_(self, "response_format", response_format)
+        set_(self, "path_args", path_args)
+        set_(self, "model_names", tuple(model_names))
+        set_(self, "_converters", {
+            status: {dict: _from_dict, model_cls: _from_model}
+            for status, model_cls in self.responses.items()
+        })
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def validation_rate(self, extension: Any) -> float:
+        if self.response_validation_rate is not None:
+            return self.response_validation_rate
+        return getattr(extension, "response_validation_rate", 1.0)
+
+    def convert_response(self, status: int, value: Any) -> dict:
+        """Validate the value against the model of the status code.
+
+        Raises TypeError or ValidationError if the value is invalid.
+        """
+        model_cls = self.responses[status]
+        converters = self._converters[status]
+        value_type = type(value)
+        convert = converters.get(value_type)
+        if convert is None:
+            if isinstance(value, dict):
+                convert = _from_dict
+            elif is_builtin_dataclass(value):
+                convert = _from_dataclass
+            else:
+                raise TypeError("invalid response")
+            converters[value_type] = convert
+        return _model_to_dict(convert(model_cls, value))
+
+
+def prepare_plan(
+    func: Callable,
+    query_string: Optional[PydanticModel],
+    body: Optional[PydanticModel],
+    source: DataSource,
+    validate_path_args: Union[bool, PydanticModel],
+    responses: Union[PydanticModel, Dict[int, PydanticModel], None],
+    headers: Optional[PydanticModel],
+    response_validation_rate: Optional[float],
+    response_format: DataSource,
+    max_body_errors: Union[None, int, Inherit],
+    limits: BodyLimits,
+    views: Iterable[Callable],
+    body_extractor: Callable,
+    query_string_extractor: Callable,
+    headers_extractor: Callable
+) -> ValidationPlan:
+    """Convert and check the models of the view and compile its plan
+    with the extractors of the framework, the models are set on the
+    views for the openapi document.
+    """
+    attributes: Dict[str, Any] = {}
+    path_args = None
+    if validate_path_args:
+        path_model = check_path_args_schema(validate_path_args, func)
+        path_args = PathArgsParser(path_model)
+        attributes[SCHEMA_PATH_ATTRIBUTE] = path_model
+
+    extractors = []
+    if body is not None:
+        body = check_body_schema(body, source)
+        extractors.append(
+            ("body_params",
+             body_extractor(body, source, max_body_errors, limits)))
+        attributes[SCHEMA_REQUEST_ATTRIBUTE] = (body, source)
+    if query_string is not None:
+        query_string = check_query_string_schema(query_string)
+        extractors.append(
+            ("query_params", query_string_extractor(query_string)))
+        attributes[SCHEMA_QUERYSTRING_ATTRIBUTE] = query_string
+    if headers is not None:
+        headers = check_headers_schema(headers)
+        extractors.append(("header_params", headers_extractor(headers)))
+        attributes[SCHEMA_HEADERS_ATTRIBUTE] = headers
+    if responses is not None:
+        responses = check_response_schema(responses)
+        attributes[SCHEMA_RESPONSE_ATTRIBUTE] = responses
+
+    for model in (query_string, body, *(responses or {}).values()):
+        if model is not None:
+            register_model(getattr(model, "item_model", model))
+
+    for view in views:
+        for name, value in attributes.items():
+            setattr(view, name, value)
+
+    return ValidationPlan(
+        extractors, responses, response_validation_rate, response_format,
+        path_args,
+        tuple(
+            getattr(model, "item_model", model).__name__
+            for model in (
+                query_string, headers, body, *(responses or {}).values())
+            if model is not None
+        )
+    )
+
+
 def tags(*tags: Iterable[str]) -> Callable:
     """Add tag names to the route."""
 
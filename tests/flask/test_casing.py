@@ -1,8 +1,11 @@
 from dataclasses import dataclass
+from typing import List
 
-from flask import Flask
+from flask import Flask, g
+from pydantic import BaseModel
 
 from schema_validator import SchemaValidator
+from schema_validator.casing import cache_info as casing_cache_info
 from schema_validator.flask import validate
 
 
@@ -11,6 +14,15 @@ class Data:
     snake_case: str
 
 
+class Inner(BaseModel):
+    snake_case: str
+
+
+class Nested(BaseModel):
+    inner_list: List[Inner]
+    inner: Inner
+
+
 def test_response_casing() -> None:
     app = Flask(__name__)
     SchemaValidator(app, convert_casing=True)
@@ -23,3 +35,53 @@ def test_response_casing() -> None:
     test_client = app.test_client()
     response = test_client.get("/")
     assert response.json == {"snakeCase": "Hello"}
+
+
+def test_request_casing() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, convert_casing=True)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Nested, responses=Nested)
+    def index():
+        assert g.body_params.inner.snake_case == "Hello"
+        return g.body_params
+
+    test_client = app.test_client()
+    response = test_client.post(
+        "/", json={"innerList": [{"snakeCase": "a"}],
+                   "inner": {"snakeCase": "Hello"}}
+    )
+    assert response.json == {
+        "innerList": [{"snakeCase": "a"}], "inner": {"snakeCase": "Hello"}
+    }
+    assert casing_cache_info()["aliases"] >= 2
+
+
+class CamelUser(BaseModel):
+    userId: int
+
+
+class SnakeUser(BaseModel):
+    user_id: int
+
+
+def test_request_casing_camel_fields() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, convert_casing=True)
+
+    @app.route("/camel", methods=["POST"])
+    @validate(body=CamelUser)
+    def camel():
+        return ""
+
+    @app.route("/snake", methods=["POST"])
+    @validate(body=SnakeUser)
+    def snake():
+        return str(g.body_params.user_id)
+
+    test_client = app.test_client()
+    test_client.post("/camel", json={"userId": 1})
+    response = test_client.post("/snake", json={"userId": 1})
+    assert response.status_code == 200
+    assert response.get_data() == b"1"
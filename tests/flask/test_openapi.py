@@ -0,0 +1,172 @@
+import json
+
+from pydantic import BaseModel
+from flask import Flask
+
+from schema_validator import SchemaValidator
+from schema_validator.flask import validate
+
+
+class Details(BaseModel):
+    name: str
+
+
+def test_openapi_etag() -> None:
+    app = Flask(__name__)
+    app.config["SWAGGER_ROUTE"] = True
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(responses=Details)
+    def index():
+        return Details(name="bob")
+
+    test_client = app.test_client()
+    response = test_client.get("/swagger/openapi.json")
+    assert response.status_code == 200
+    assert "/" in response.json["paths"]
+    etag = response.headers["ETag"]
+
+    response = test_client.get(
+        "/swagger/openapi.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    @app.route("/other")
+    @validate(responses=Details)
+    def other():
+        return Details(name="bob")
+
+    response = test_client.get(
+        "/swagger/openapi.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert "/other" in response.json["paths"]
+    etag = response.headers["ETag"]
+
+    @validate(responses=Details)
+    def replaced():
+        """Replaced"""
+        return Details(name="bob")
+
+    app.view_functions["other"] = replaced
+    response = test_client.get(
+        "/swagger/openapi.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json["paths"]["/other"]["get"]["summary"] == "Replaced"
+
+
+def test_model_schema_registry() -> None:
+    from schema_validator.core import _build_openapi_schema, model_schemas
+
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/a")
+    @validate(responses={200: Details, 400: Details})
+    def a():
+        return Details(name="bob")
+
+    @app.route("/b", methods=["POST"])
+    @validate(body=Details, responses=Details)
+    def b():
+        return Details(name="bob")
+
+    model_schemas.clear()
+    schema = _build_openapi_schema(app, app.extensions["SCHEMA_VALIDATOR"])
+    assert model_schemas.misses == 1
+    assert model_schemas.hits == 3
+    assert schema["paths"]["/b"]["post"]["requestBody"]
+
+
+def test_path_parameters() -> None:
+    app = Flask(__name__)
+    app.config["SWAGGER_ROUTE"] = True
+    SchemaValidator(app)
+
+    @app.route("/<int:id>/<name>")
+    @validate(validate_path_args=True)
+    def index(id: int, name: str):
+        return ""
+
+    @app.route("/<uuid:key>")
+    def untyped(key):
+        return ""
+
+    test_client = app.test_client()
+    paths = test_client.get("/swagger/openapi.json").json["paths"]
+    parameters = paths["/{id}/{name}"]["get"]["parameters"]
+    assert [(p["name"], p["schema"]["type"]) for p in parameters] == [
+        ("id", "integer"), ("name", "string")]
+    parameter, = paths["/{key}"]["get"]["parameters"]
+    assert parameter["schema"] == {"type": "string", "format": "uuid"}
+
+
+def test_warmup() -> None:
+    app = Flask(__name__)
+    validator = SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, responses=Details, tags=["a"])
+    def item():
+        return Details(name="bob")
+
+    @app.route("/other")
+    @validate(responses=Details, tags=["b"])
+    def other():
+        return Details(name="bob")
+
+    summary = validator.warmup(app)
+    assert summary["prepared"] == 2
+    assert summary["documents"] == 3
+    assert item._schema_preparation.prepared
+    assert other._schema_preparation.prepared
+    documents = validator._openapi_cache[app][1]
+    assert set(documents) == {(None, False), ("a", False), ("b", False)}
+    assert validator.warmup(app)["prepared"] == 0
+
+
+def test_schema_command_all_tags(tmp_path) -> None:
+    from schema_validator import generate_schema_command
+
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, responses=Details, tags=["a"])
+    def item():
+        return Details(name="bob")
+
+    @app.route("/other")
+    @validate(responses=Details, tags=["b"])
+    def other():
+        return Details(name="bob")
+
+    runner = app.test_cli_runner()
+    args = ["--all-tags", "--output-dir", str(tmp_path)]
+    result = runner.invoke(generate_schema_command, args)
+    assert result.exit_code == 0, result.output
+    assert "3 specs" in result.output and "3 written" in result.output
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "openapi-a.json", "openapi-b.json", "openapi.json"]
+    spec = json.loads((tmp_path / "openapi-a.json").read_text())
+    assert list(spec["paths"]) == ["/"]
+    spec = json.loads((tmp_path / "openapi.json").read_text())
+    assert set(spec["paths"]) == {"/", "/other"}
+
+    result = runner.invoke(generate_schema_command, args)
+    assert "0 written, 3 unchanged" in result.output
+
+    result = runner.invoke(generate_schema_command, ["--all-tags"])
+    assert result.exit_code != 0
+    result = runner.invoke(generate_schema_command, args + ["-t", "a"])
+    assert result.exit_code != 0
+
+
+def test_schema_command_file_names() -> None:
+    from schema_validator.command import _spec_file_name
+
+    names = {_spec_file_name(tag) for tag in ("a/b", "a b", "a_b")}
+    assert len(names) == 3
+    assert "openapi-a_b.json" in names
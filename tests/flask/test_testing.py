@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, List, Optional
 
 import pytest
 from pydantic import BaseModel
@@ -8,7 +8,9 @@ from flask import Flask, g
 from schema_validator import DataSource, SchemaValidator
 from schema_validator.flask import validate
 from schema_validator.core import _build_openapi_schema
+from schema_validator.json_backend import JSONBackend, StdlibJSONBackend
 from schema_validator.types import PydanticModel
+from schema_validator.utils import INHERIT
 
 
 @dataclass
@@ -68,3 +70,152 @@ def test_generate_swagger():
 
     assert schema["paths"]["/test"]["post"]["requestBody"]
     assert schema["paths"]["/test"]["post"]["responses"]
+
+
+def test_json_backend() -> None:
+    calls = []
+
+    class RecordingBackend(StdlibJSONBackend):
+        def dumps(self, object_):
+            calls.append("dumps")
+            return super().dumps(object_)
+
+        def loads(self, data):
+            calls.append("loads")
+            return super().loads(data)
+
+    app = Flask(__name__)
+    SchemaValidator(app, json_backend=RecordingBackend())
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, responses=Details)
+    def index():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = test_client.post("/", json=dict(name="bob", age=2))
+    assert response.get_json() == {"name": "bob", "age": 2}
+    assert calls == ["loads", "dumps"]
+
+    response = test_client.post("/", json=dict(age=2))
+    assert response.status_code == 400
+    assert "body_params" in response.get_json()["validation_error"]
+    assert calls == ["loads", "dumps", "loads", "dumps"]
+
+
+def test_json_backend_abstract() -> None:
+    class DumpsOnly(JSONBackend):
+        def dumps(self, object_):
+            return b""
+
+    with pytest.raises(TypeError):
+        DumpsOnly()
+
+
+@pytest.mark.parametrize(
+    "source, data",
+    [
+        (
+            DataSource.NDJSON,
+            b'{"name": "bob", "age": 2}\n{"age": 3}\n\n{"name": "ann"}\n'
+        ),
+        (
+            DataSource.JSON_STREAM,
+            b'[{"name": "bob", "age": 2}, {"age": 3}, {"name": "ann"}]'
+        ),
+    ],
+)
+def test_send_stream(source: DataSource, data: bytes) -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=source)
+    def index():
+        names = [item.name for item in g.body_params]
+        errors = [number for number, _ in g.body_params.errors]
+        return {"names": names, "errors": errors}
+
+    test_client = app.test_client()
+    response = test_client.post("/", data=data)
+    result = response.get_json()
+    assert result["names"] == ["bob", "ann"]
+    assert result["errors"] == [2 if source == DataSource.NDJSON else 1]
+
+
+def test_send_stream_errors() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, max_body_errors=2)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=DataSource.NDJSON)
+    def index():
+        names = [item.name for item in g.body_params]
+        return {
+            "names": names, "errors": g.body_params.errors,
+            "omitted": g.body_params.omitted_errors
+        }
+
+    test_client = app.test_client()
+    data = b'{"name": "bob"}\n' + b'{"age": 1}\n' * 100 + b'{"name": "ann"}'
+    result = test_client.post("/", data=data).get_json()
+    assert result["names"] == ["bob", "ann"]
+    assert result["errors"] == [
+        [2, [{"loc": ["name"], "msg": "field required",
+              "type": "value_error.missing"}]],
+        [3, [{"loc": ["name"], "msg": "field required",
+              "type": "value_error.missing"}]],
+    ]
+    assert result["omitted"] == 98
+
+
+@pytest.mark.parametrize(
+    "source, data",
+    [
+        (DataSource.NDJSON, b'{"name": "bob"}\n{"name": "%s"}\n'),
+        (DataSource.JSON_STREAM, b'[{"name": "bob"}, {"name": "%s"}]'),
+        (DataSource.JSON_STREAM, b'[{"name": "bob"}, {"name": tru}, %s]'),
+    ],
+)
+def test_send_stream_item_size(source: DataSource, data: bytes) -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, max_stream_item_size=64)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=source)
+    def index():
+        names = [item.name for item in g.body_params]
+        errors = [number for number, _ in g.body_params.errors]
+        return {"names": names, "errors": errors}
+
+    test_client = app.test_client()
+    response = test_client.post("/", data=data % (b"a" * 100))
+    assert response.get_json() == {"names": ["bob"], "errors": [1]}
+
+
+@pytest.mark.parametrize(
+    "max_body_errors, errors", [(INHERIT, 1), (2, 2), (None, 3)]
+)
+def test_send_list(max_body_errors: Any, errors: int) -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, max_body_errors=1)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=List[DCDetails], max_body_errors=max_body_errors)
+    def index():
+        return {"names": [item.name for item in g.body_params]}
+
+    test_client = app.test_client()
+    response = test_client.post("/", json=[dict(name="bob"), dict(name="a")])
+    assert response.get_json() == {"names": ["bob", "a"]}
+
+    response = test_client.post(
+        "/", json=[dict(age=1), {}, dict(name="a"), dict(age=2)])
+    assert response.status_code == 400
+    error = response.get_json()["validation_error"]["body_params"]
+    assert len(error) == errors
+    assert error[0]["loc"] == [0, "name"]
+
+    schema = _build_openapi_schema(app, app.extensions["SCHEMA_VALIDATOR"])
+    request_body = schema["paths"]["/"]["post"]["requestBody"]
+    assert request_body["content"]["application/json"]["schema"]["items"]
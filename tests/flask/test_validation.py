@@ -1,12 +1,20 @@
+import json
 from dataclasses import dataclass
-from typing import Any, Optional
+from enum import Enum
+from io import BytesIO
+from typing import Any, List, Optional
 
 import pytest
-from pydantic import BaseModel
+from pydantic import BaseModel, conint
 from pydantic.dataclasses import dataclass as pydantic_dataclass
-from flask import Flask, jsonify
+from flask import Flask, Response, g, jsonify
 
 from schema_validator import DataSource, SchemaValidator
+from schema_validator.constants import SCHEMA_REQUEST_ATTRIBUTE
+from schema_validator.preparation import prepare_all
+from schema_validator.profiling import Profiler
+from schema_validator.utils import SchemaInvalidError, ValidationPlan, \
+    check_body_schema
 from schema_validator.flask import validate
 
 
@@ -142,6 +150,36 @@ def test_response_validation(
     assert response.status_code == status
 
 
+@pytest.mark.parametrize("report", [False, True])
+@pytest.mark.parametrize(
+    "return_value",
+    [Response("<p>bob</p>", mimetype="text/html"), Response(status=200)],
+)
+def test_response_not_json(return_value: Response, report: bool) -> None:
+    app = Flask(__name__)
+    errors = []
+    SchemaValidator(
+        app,
+        response_validation_error_handler=(
+            lambda *args: errors.append(args)) if report else None
+    )
+
+    @app.route("/")
+    @validate(responses=Item)
+    def item():
+        return return_value
+
+    test_client = app.test_client()
+    response = test_client.get("/")
+    if report:
+        assert response.status_code == 200
+        assert response.get_data() == return_value.get_data()
+        assert errors[0][0] == "item"
+    else:
+        assert response.status_code == 400
+        assert response.get_json()["validation_error"]["response"]
+
+
 @pytest.mark.parametrize(
     "path, status",
     [
@@ -164,3 +202,391 @@ def test_querystring_validation(path: str, status: int) -> None:
     test_client = app.test_client()
     response = test_client.get(path)
     assert response.status_code == status
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class ListQuery(BaseModel):
+    ids: List[int] = []
+    color: Optional[Color] = None
+    active: bool = False
+
+
+def test_querystring_parser() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(query_string=ListQuery)
+    def query_list():
+        return jsonify(g.query_params.dict())
+
+    test_client = app.test_client()
+    response = test_client.get("/?ids=1&ids=2&color=blue&active=yes&x=1")
+    assert response.json == {"ids": [1, 2], "color": "blue", "active": True}
+    response = test_client.get("/?ids=1&ids=a&color=green")
+    assert response.status_code == 400
+
+
+class Headers(BaseModel):
+    x_request_id: str
+    x_retries: int = 0
+
+
+def test_headers_validation() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(headers=Headers)
+    def headers():
+        return jsonify(g.header_params.dict())
+
+    test_client = app.test_client()
+    response = test_client.get(
+        "/", headers={"X-Request-Id": "abc", "x-retries": "2", "X-Other": "1"})
+    assert response.get_json() == {"x_request_id": "abc", "x_retries": 2}
+    response = test_client.get("/", headers={"X-Retries": "2"})
+    assert response.status_code == 400
+    response = test_client.get(
+        "/", headers={"X-Request-Id": "abc", "X-Retries": "a"})
+    assert response.status_code == 400
+
+
+class PathArgs(BaseModel):
+    count: conint(le=10)
+
+
+def test_path_args_validation() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/<int:count>/<name>")
+    @validate(validate_path_args=True)
+    def annotated(count: int, name: Color):
+        return jsonify(count=count, name=name.name)
+
+    @app.route("/model/<int:count>")
+    @validate(validate_path_args=PathArgs)
+    def model(count):
+        return ""
+
+    test_client = app.test_client()
+    response = test_client.get("/2/red")
+    assert response.get_json() == {"count": 2, "name": "RED"}
+    response = test_client.get("/2/green")
+    assert response.status_code == 400
+    response = test_client.get("/model/2")
+    assert response.status_code == 200
+    response = test_client.get("/model/20")
+    assert response.status_code == 400
+
+
+def test_validation_plan_is_immutable() -> None:
+    plan = ValidationPlan([], {200: Item})
+    with pytest.raises(AttributeError):
+        plan.responses = {}
+    assert plan.convert_response(200, VALID) == VALID.dict()
+    assert plan.convert_response(200, VALID_DC) == VALID.dict()
+    with pytest.raises(TypeError):
+        plan.convert_response(200, "invalid")
+
+
+def test_response_validation_sampling() -> None:
+    app = Flask(__name__)
+    errors = []
+    SchemaValidator(
+        app,
+        response_validation_error_handler=lambda *args: errors.append(args)
+    )
+
+    @app.route("/")
+    @validate(responses=Item, response_validation_rate=0.0)
+    def unsampled():
+        return INVALID
+
+    @app.route("/sampled")
+    @validate(responses=Item)
+    def sampled():
+        return INVALID_DICT
+
+    test_client = app.test_client()
+    response = test_client.get("/")
+    assert response.status_code == 200
+    assert response.get_json() == INVALID.dict()
+    assert errors == []
+
+    response = test_client.get("/sampled")
+    assert response.status_code == 200
+    assert errors[0][0] == "sampled"
+
+
+def test_response_validation_rate_policy() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, response_validation_rate=0.5)
+
+    @app.route("/")
+    @validate(responses=Item, response_validation_rate=1.0)
+    def forced():
+        return INVALID_DICT
+
+    @app.route("/sampled")
+    @validate(responses=Item, response_validation_rate=1 - 1e-9)
+    def sampled():
+        return INVALID_DICT
+
+    test_client = app.test_client()
+    assert test_client.get("/").status_code == 400
+    assert test_client.get("/sampled").status_code == 200
+
+    with pytest.raises(ValueError):
+        validate(responses=Item, response_validation_rate=2)
+    with pytest.raises(ValueError):
+        SchemaValidator(response_validation_rate=-1)
+
+
+def test_response_stream() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(responses=Item)
+    def items():
+        return (VALID for _ in range(3))
+
+    @app.route("/ndjson")
+    @validate(responses=Item, response_format=DataSource.NDJSON)
+    def ndjson_items():
+        yield VALID_DICT
+        yield VALID_DC
+
+    test_client = app.test_client()
+    response = test_client.get("/")
+    assert response.get_json() == [VALID.dict()] * 3
+
+    response = test_client.get("/ndjson")
+    assert response.mimetype == "application/x-ndjson"
+    assert response.get_data().count(b"\n") == 2
+
+
+def test_response_async_stream() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(responses=Item)
+    def items():
+        async def generate():
+            yield VALID
+        return generate()
+
+    app.testing = True
+    with pytest.raises(TypeError, match="async iterator"):
+        app.test_client().get("/")
+
+
+def test_error_renderer() -> None:
+    app = Flask(__name__)
+    SchemaValidator(
+        app,
+        max_validation_errors=2,
+        error_renderer=lambda errors: {"errors": errors}
+    )
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item)
+    def item():
+        return ""
+
+    test_client = app.test_client()
+    response = test_client.post("/", json={"details": {"age": "x"}})
+    assert response.status_code == 400
+    errors = response.get_json()["errors"]["body_params"]
+    assert errors[0] == {
+        "loc": ["count"], "msg": "field required",
+        "type": "value_error.missing"
+    }
+    assert len(errors) == 2
+    assert errors[1]["type"] == "value_error.truncated"
+
+
+@pytest.mark.parametrize(
+    "json, status",
+    [
+        (VALID_DICT, 200),
+        ({**VALID_DICT, "extra": "x" * 100}, 413),
+        ({"count": 2, "details": {"name": "bob", "a": {"b": {}}}}, 400),
+        ({"count": 2, "details": {"name": "bob", "a": [1, 2, 3]}}, 400),
+        (
+            {"count": 2, "details": {"name": "bob", "a": 1, "b": 2, "c": 3}},
+            400
+        ),
+    ],
+)
+def test_body_limits(json: dict, status: int) -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, max_body_depth=3, max_object_keys=3)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, max_body_size=100, max_array_length=2)
+    def item():
+        return ""
+
+    test_client = app.test_client()
+    response = test_client.post("/", json=json)
+    assert response.status_code == status
+    if status != 200:
+        assert response.get_json()["validation_error"]["body_params"]
+
+
+@pytest.mark.parametrize(
+    "content_type, data, status",
+    [
+        ("application/x-www-form-urlencoded", b"name=bob", 200),
+        ("application/x-www-form-urlencoded", b"name=" + b"x" * 50, 413),
+        ("application/json", b'{"name": "bob"}', 200),
+        ("application/json", b'{"name": "' + b"x" * 50 + b'"}', 413),
+    ],
+)
+def test_chunked_body_size(
+    content_type: str, data: bytes, status: int
+) -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, max_body_size=20)
+
+    @app.route("/", methods=["POST"])
+    @validate(
+        body=Details,
+        source=DataSource.JSON if "json" in content_type else DataSource.FORM
+    )
+    def item():
+        return g.body_params.name
+
+    test_client = app.test_client()
+    response = test_client.post(
+        "/", input_stream=BytesIO(data), content_type=content_type,
+        environ_overrides={"wsgi.input_terminated": True}
+    )
+    assert response.status_code == status
+    if status == 200:
+        assert response.get_data() == b"bob"
+
+
+def test_metrics() -> None:
+    app = Flask(__name__)
+    validator = SchemaValidator(app, metrics=True)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = test_client.post("/", json=VALID_DICT)
+    assert response.status_code == 200
+    test_client.post("/", json=INVALID_DICT)
+
+    snapshot = validator.metrics.snapshot()["item"]
+    assert set(snapshot) == {
+        "parse", "validate", "view", "response_validate", "serialize"}
+    assert snapshot["parse"]["count"] == 2
+    assert snapshot["validate"]["count"] == 2
+    assert snapshot["view"]["buckets"][10.0] == 1
+    assert snapshot["serialize"]["count"] == 1
+
+    response = test_client.get("/metrics")
+    text = response.get_data(as_text=True)
+    assert response.mimetype == "text/plain"
+    assert 'endpoint="item",phase="view",le="+Inf"} 1' in text
+
+
+def test_server_timing() -> None:
+    app = Flask(__name__)
+    SchemaValidator(app, server_timing_token="secret")
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = test_client.post("/", json=VALID_DICT)
+    assert "Server-Timing" not in response.headers
+    response = test_client.post(
+        "/", json=VALID_DICT, headers={"X-Server-Timing": "wrong"})
+    assert "Server-Timing" not in response.headers
+    response = test_client.post(
+        "/", json=VALID_DICT, headers={"X-Server-Timing": "secret"})
+    timing = response.headers["Server-Timing"]
+    assert "parse;dur=" in timing and "serialize;dur=" in timing
+    assert 'response_bytes;desc="' in timing
+
+
+def test_profiler(tmp_path) -> None:
+    app = Flask(__name__)
+    profiler = Profiler(
+        str(tmp_path), slow_threshold={"item": 0.0}, max_profiles=1)
+    SchemaValidator(app, profiler=profiler)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    test_client.post("/", json=VALID_DICT)
+    assert list(tmp_path.iterdir()) == []
+    for _ in range(2):
+        test_client.post("/", json=VALID_DICT)
+    files = sorted(path.suffix for path in tmp_path.iterdir())
+    assert files == [".json", ".prof"]
+    sidecar, = tmp_path.glob("*.json")
+    metadata = json.loads(sidecar.read_text())
+    assert metadata["endpoint"] == "item"
+    assert metadata["reason"] == "slow"
+    assert metadata["models"] == ["Item", "Item"]
+
+
+def test_deferred_preparation() -> None:
+    app = Flask(__name__)
+    validator = SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=DCItem, query_string=QueryItem)
+    def item():
+        return ""
+
+    @app.route("/other")
+    @validate(responses=DCItem)
+    def other():
+        return VALID_DC
+
+    assert validator.pending_preparations(app) == 2
+    with app.app_context():
+        assert validator.pending_preparations() == 2
+    other_app = Flask("other")
+    assert SchemaValidator(other_app).pending_preparations(other_app) == 0
+    assert not hasattr(item, SCHEMA_REQUEST_ATTRIBUTE)
+    test_client = app.test_client()
+    response = test_client.post("/", json=VALID_DICT)
+    assert response.status_code == 200
+    assert item._schema_preparation.prepared
+    assert not other._schema_preparation.prepared
+    prepare_all()
+    assert validator.pending_preparations(app) == 0
+    assert other._schema_preparation.prepared
+
+
+def test_form_nested_fields() -> None:
+    class ListForm(BaseModel):
+        details: List[Details] = []
+
+    class NestedForm(BaseModel):
+        details: Details
+
+    assert check_body_schema(ListForm, DataSource.FORM) is ListForm
+    with pytest.raises(SchemaInvalidError):
+        check_body_schema(NestedForm, DataSource.FORM)
@@ -0,0 +1,68 @@
+import pytest
+from pydantic import BaseModel
+from quart import Quart
+
+from schema_validator import SchemaValidator
+from schema_validator.quart import validate
+
+
+class Details(BaseModel):
+    name: str
+
+
+@pytest.mark.asyncio
+async def test_openapi_etag() -> None:
+    app = Quart(__name__)
+    app.config["SWAGGER_ROUTE"] = True
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(responses=Details)
+    async def index():
+        return Details(name="bob")
+
+    test_client = app.test_client()
+    response = await test_client.get("/swagger/openapi.json")
+    assert response.status_code == 200
+    assert "/" in (await response.get_json())["paths"]
+    etag = response.headers["ETag"]
+
+    response = await test_client.get(
+        "/swagger/openapi.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+
+    @app.route("/other")
+    @validate(responses=Details)
+    async def other():
+        return Details(name="bob")
+
+    response = await test_client.get(
+        "/swagger/openapi.json", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert "/other" in (await response.get_json())["paths"]
+
+
+def test_warmup() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, responses=Details, tags=["a"])
+    async def item():
+        return Details(name="bob")
+
+    @app.route("/other")
+    @validate(responses=Details, tags=["b"])
+    async def other():
+        return Details(name="bob")
+
+    summary = validator.warmup(app)
+    assert summary["prepared"] == 2
+    assert summary["documents"] == 3
+    assert item._schema_preparation.prepared
+    assert other._schema_preparation.prepared
+    documents = validator._openapi_cache[app][1]
+    assert set(documents) == {(None, False), ("a", False), ("b", False)}
+    assert validator.warmup(app)["prepared"] == 0
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, List, Optional
 
 import pytest
 from pydantic import BaseModel
@@ -8,7 +8,9 @@ from quart import Quart, g
 from schema_validator import DataSource, SchemaValidator
 from schema_validator.quart import validate
 from schema_validator.core import _build_openapi_schema
+from schema_validator.json_backend import StdlibJSONBackend
 from schema_validator.types import PydanticModel
+from schema_validator.utils import INHERIT
 
 
 @dataclass
@@ -73,3 +75,152 @@ async def test_generate_swagger():
 
     assert schema["paths"]["/test"]["post"]["requestBody"]
     assert schema["paths"]["/test"]["post"]["responses"]
+
+
+@pytest.mark.asyncio
+async def test_json_backend() -> None:
+    calls = []
+
+    class RecordingBackend(StdlibJSONBackend):
+        def dumps(self, object_):
+            calls.append("dumps")
+            return super().dumps(object_)
+
+        def loads(self, data):
+            calls.append("loads")
+            return super().loads(data)
+
+    app = Quart(__name__)
+    SchemaValidator(app, json_backend=RecordingBackend())
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, responses=Details)
+    async def index():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=dict(name="bob", age=2))
+    assert await response.get_json() == {"name": "bob", "age": 2}
+    assert calls == ["loads", "dumps"]
+
+    response = await test_client.post("/", json=dict(age=2))
+    assert response.status_code == 400
+    result = await response.get_json()
+    assert "body_params" in result["validation_error"]
+    assert calls == ["loads", "dumps", "loads", "dumps"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "source, data",
+    [
+        (
+            DataSource.NDJSON,
+            b'{"name": "bob", "age": 2}\n{"age": 3}\n\n{"name": "ann"}\n'
+        ),
+        (
+            DataSource.JSON_STREAM,
+            b'[{"name": "bob", "age": 2}, {"age": 3}, {"name": "ann"}]'
+        ),
+    ],
+)
+async def test_send_stream(source: DataSource, data: bytes) -> None:
+    app = Quart(__name__)
+    SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=source)
+    async def index():
+        names = [item.name async for item in g.body_params]
+        errors = [number for number, _ in g.body_params.errors]
+        return {"names": names, "errors": errors}
+
+    test_client = app.test_client()
+    response = await test_client.post("/", data=data)
+    result = await response.get_json()
+    assert result["names"] == ["bob", "ann"]
+    assert result["errors"] == [2 if source == DataSource.NDJSON else 1]
+
+
+@pytest.mark.asyncio
+async def test_send_stream_errors() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, max_body_errors=2)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=DataSource.NDJSON)
+    async def index():
+        names = [item.name async for item in g.body_params]
+        return {
+            "names": names, "errors": g.body_params.errors,
+            "omitted": g.body_params.omitted_errors
+        }
+
+    test_client = app.test_client()
+    data = b'{"name": "bob"}\n' + b'{"age": 1}\n' * 100 + b'{"name": "ann"}'
+    response = await test_client.post("/", data=data)
+    result = await response.get_json()
+    assert result["names"] == ["bob", "ann"]
+    assert result["errors"] == [
+        [2, [{"loc": ["name"], "msg": "field required",
+              "type": "value_error.missing"}]],
+        [3, [{"loc": ["name"], "msg": "field required",
+              "type": "value_error.missing"}]],
+    ]
+    assert result["omitted"] == 98
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "source, data",
+    [
+        (DataSource.NDJSON, b'{"name": "bob"}\n{"name": "%s"}\n'),
+        (DataSource.JSON_STREAM, b'[{"name": "bob"}, {"name": "%s"}]'),
+        (DataSource.JSON_STREAM, b'[{"name": "bob"}, {"name": tru}, %s]'),
+    ],
+)
+async def test_send_stream_item_size(source: DataSource, data: bytes) -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, max_stream_item_size=64)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Details, source=source)
+    async def index():
+        names = [item.name async for item in g.body_params]
+        errors = [number for number, _ in g.body_params.errors]
+        return {"names": names, "errors": errors}
+
+    test_client = app.test_client()
+    response = await test_client.post("/", data=data % (b"a" * 100))
+    assert await response.get_json() == {"names": ["bob"], "errors": [1]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "max_body_errors, errors", [(INHERIT, 1), (2, 2), (None, 3)]
+)
+async def test_send_list(max_body_errors: Any, errors: int) -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, max_body_errors=1)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=List[DCDetails], max_body_errors=max_body_errors)
+    async def index():
+        return {"names": [item.name for item in g.body_params]}
+
+    test_client = app.test_client()
+    response = await test_client.post(
+        "/", json=[dict(name="bob"), dict(name="a")])
+    assert await response.get_json() == {"names": ["bob", "a"]}
+
+    response = await test_client.post(
+        "/", json=[dict(age=1), {}, dict(name="a"), dict(age=2)])
+    assert response.status_code == 400
+    result = await response.get_json()
+    error = result["validation_error"]["body_params"]
+    assert len(error) == errors
+    assert error[0]["loc"] == [0, "name"]
+
+    schema = _build_openapi_schema(app, app.extensions["SCHEMA_VALIDATOR"])
+    request_body = schema["paths"]["/"]["post"]["requestBody"]
+    assert request_body["content"]["application/json"]["schema"]["items"]
@@ -1,12 +1,20 @@
+import asyncio
+import json
+import threading
 from dataclasses import dataclass
-from typing import Any, Optional
+from enum import Enum
+from typing import Any, List, Optional
 
 import pytest
-from pydantic import BaseModel
+from pydantic import BaseModel, conint
 from pydantic.dataclasses import dataclass as pydantic_dataclass
-from quart import Quart, jsonify
+from quart import Quart, Response, g, jsonify
+from quart.views import MethodView
 
-from schema_validator import DataSource, SchemaValidator
+from schema_validator import DataSource, SchemaValidator, tags
+from schema_validator.constants import SCHEMA_REQUEST_ATTRIBUTE
+from schema_validator.preparation import prepare_all
+from schema_validator.profiling import Profiler
 from schema_validator.quart import validate
 
 
@@ -145,6 +153,40 @@ async def test_response_validation(
     assert response.status_code == status
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("report", [False, True])
+@pytest.mark.parametrize(
+    "body, mimetype",
+    [("<p>bob</p>", "text/html"), ("", "application/json")],
+)
+async def test_response_not_json(
+    body: str, mimetype: str, report: bool
+) -> None:
+    app = Quart(__name__)
+    errors = []
+    SchemaValidator(
+        app,
+        response_validation_error_handler=(
+            lambda *args: errors.append(args)) if report else None
+    )
+
+    @app.route("/")
+    @validate(responses=Item)
+    async def item():
+        return Response(body, mimetype=mimetype)
+
+    test_client = app.test_client()
+    response = await test_client.get("/")
+    if report:
+        assert response.status_code == 200
+        assert await response.get_data(as_text=True) == body
+        assert errors[0][0] == "item"
+    else:
+        assert response.status_code == 400
+        result = await response.get_json()
+        assert result["validation_error"]["response"]
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "path, status",
@@ -168,3 +210,481 @@ async def test_querystring_validation(path: str, status: int) -> None:
     test_client = app.test_client()
     response = await test_client.get(path)
     assert response.status_code == status
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class ListQuery(BaseModel):
+    ids: List[int] = []
+    color: Optional[Color] = None
+    active: bool = False
+
+
+@pytest.mark.asyncio
+async def test_querystring_parser() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(query_string=ListQuery)
+    async def query_list():
+        return jsonify(g.query_params.dict())
+
+    test_client = app.test_client()
+    response = await test_client.get(
+        "/?ids=1&ids=2&color=blue&active=yes&x=1")
+    assert await response.get_json() == {
+        "ids": [1, 2], "color": "blue", "active": True}
+    response = await test_client.get("/?ids=1&ids=a&color=green")
+    assert response.status_code == 400
+
+
+class Headers(BaseModel):
+    x_request_id: str
+    x_retries: int = 0
+
+
+@pytest.mark.asyncio
+async def test_headers_validation() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(headers=Headers)
+    async def headers():
+        return jsonify(g.header_params.dict())
+
+    test_client = app.test_client()
+    response = await test_client.get(
+        "/", headers={"X-Request-Id": "abc", "x-retries": "2", "X-Other": "1"})
+    assert await response.get_json() == {"x_request_id": "abc", "x_retries": 2}
+    response = await test_client.get("/", headers={"X-Retries": "2"})
+    assert response.status_code == 400
+    response = await test_client.get(
+        "/", headers={"X-Request-Id": "abc", "X-Retries": "a"})
+    assert response.status_code == 400
+
+
+class PathArgs(BaseModel):
+    count: conint(le=10)
+
+
+@pytest.mark.asyncio
+async def test_path_args_validation() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app)
+
+    @app.route("/<int:count>/<name>")
+    @validate(validate_path_args=True)
+    async def annotated(count: int, name: Color):
+        return jsonify(count=count, name=name.name)
+
+    @app.route("/model/<int:count>")
+    @validate(validate_path_args=PathArgs)
+    async def model(count):
+        return ""
+
+    test_client = app.test_client()
+    response = await test_client.get("/2/red")
+    assert await response.get_json() == {"count": 2, "name": "RED"}
+    response = await test_client.get("/2/green")
+    assert response.status_code == 400
+    response = await test_client.get("/model/2")
+    assert response.status_code == 200
+    response = await test_client.get("/model/20")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_response_validation_sampling() -> None:
+    app = Quart(__name__)
+    errors = []
+    SchemaValidator(
+        app,
+        response_validation_error_handler=lambda *args: errors.append(args)
+    )
+
+    @app.route("/")
+    @validate(responses=Item, response_validation_rate=0.0)
+    async def unsampled():
+        return INVALID
+
+    @app.route("/sampled")
+    @validate(responses=Item)
+    async def sampled():
+        return INVALID_DICT
+
+    test_client = app.test_client()
+    response = await test_client.get("/")
+    assert response.status_code == 200
+    assert await response.get_json() == INVALID.dict()
+    assert errors == []
+
+    response = await test_client.get("/sampled")
+    assert response.status_code == 200
+    assert errors[0][0] == "sampled"
+
+
+@pytest.mark.asyncio
+async def test_response_validation_rate_policy() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, response_validation_rate=0.5)
+
+    @app.route("/")
+    @validate(responses=Item, response_validation_rate=1.0)
+    async def forced():
+        return INVALID_DICT
+
+    @app.route("/sampled")
+    @validate(responses=Item, response_validation_rate=1 - 1e-9)
+    async def sampled():
+        return INVALID_DICT
+
+    test_client = app.test_client()
+    assert (await test_client.get("/")).status_code == 400
+    assert (await test_client.get("/sampled")).status_code == 200
+
+    with pytest.raises(ValueError):
+        validate(responses=Item, response_validation_rate=2)
+    with pytest.raises(ValueError):
+        SchemaValidator(response_validation_rate=-1)
+
+
+@pytest.mark.asyncio
+async def test_response_stream() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app)
+
+    @app.route("/")
+    @validate(responses=Item)
+    async def items():
+        async def generate():
+            for _ in range(3):
+                yield VALID
+        return generate()
+
+    @app.route("/ndjson")
+    @validate(responses=Item, response_format=DataSource.NDJSON)
+    async def ndjson_items():
+        return iter([VALID_DICT, VALID_DC])
+
+    test_client = app.test_client()
+    response = await test_client.get("/")
+    assert await response.get_json() == [VALID.dict()] * 3
+
+    response = await test_client.get("/ndjson")
+    assert response.mimetype == "application/x-ndjson"
+    assert (await response.get_data()).count(b"\n") == 2
+
+
+@pytest.mark.asyncio
+async def test_error_renderer() -> None:
+    app = Quart(__name__)
+    SchemaValidator(
+        app,
+        max_validation_errors=2,
+        error_renderer=lambda errors: {"errors": errors}
+    )
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item)
+    async def item():
+        return ""
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json={"details": {"age": "x"}})
+    assert response.status_code == 400
+    errors = (await response.get_json())["errors"]["body_params"]
+    assert errors[0] == {
+        "loc": ["count"], "msg": "field required",
+        "type": "value_error.missing"
+    }
+    assert len(errors) == 2
+    assert errors[1]["type"] == "value_error.truncated"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "json, status",
+    [
+        (VALID_DICT, 200),
+        ({**VALID_DICT, "extra": "x" * 100}, 413),
+        ({"count": 2, "details": {"name": "bob", "a": {"b": {}}}}, 400),
+        ({"count": 2, "details": {"name": "bob", "a": [1, 2, 3]}}, 400),
+        (
+            {"count": 2, "details": {"name": "bob", "a": 1, "b": 2, "c": 3}},
+            400
+        ),
+    ],
+)
+async def test_body_limits(json: dict, status: int) -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, max_body_depth=3, max_object_keys=3)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, max_body_size=100, max_array_length=2)
+    async def item():
+        return ""
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=json)
+    assert response.status_code == status
+    if status != 200:
+        result = await response.get_json()
+        assert result["validation_error"]["body_params"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "content_type, data, status",
+    [
+        ("application/x-www-form-urlencoded", b"name=bob", 200),
+        ("application/x-www-form-urlencoded", b"name=" + b"x" * 50, 413),
+        ("application/json", b'{"name": "bob"}', 200),
+        ("application/json", b'{"name": "' + b"x" * 50 + b'"}', 413),
+    ],
+)
+async def test_chunked_body_size(
+    content_type: str, data: bytes, status: int
+) -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, max_body_size=20)
+
+    @app.route("/", methods=["POST"])
+    @validate(
+        body=Details,
+        source=DataSource.JSON if "json" in content_type else DataSource.FORM
+    )
+    async def item():
+        return g.body_params.name
+
+    test_client = app.test_client()
+    async with test_client.request(
+        "/", method="POST", headers={"Content-Type": content_type}
+    ) as connection:
+        for start in range(0, len(data), 8):
+            await connection.send(data[start:start + 8])
+        await connection.send_complete()
+    response = await connection.as_response()
+    assert response.status_code == status
+    if status == 200:
+        assert await response.get_data() == b"bob"
+
+
+@pytest.mark.asyncio
+async def test_offload_validation() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app, offload_threshold=10)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    async def item():
+        return jsonify(g.body_params.dict())
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert response.status_code == 200
+    response = await test_client.post("/", json=INVALID_DICT)
+    assert response.status_code == 400
+
+    stats = validator.offload_stats()
+    assert stats["completed"] == 3
+    assert stats["pending"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "return_value, status",
+    [(VALID_DICT, 200), (VALID, 200), (VALID_DC, 200), (INVALID_DICT, 400)],
+)
+async def test_offload_response_values(return_value: Any, status: int) -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app, offload_item_threshold=2)
+
+    @app.route("/")
+    @validate(responses=Item)
+    async def item():
+        return return_value
+
+    test_client = app.test_client()
+    response = await test_client.get("/")
+    assert response.status_code == status
+    assert validator.offload_stats()["completed"] == 1
+
+    validator.shutdown_offload_executor()
+    assert validator.offload_stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_view_executor() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app, tag_view_executors={"sync": 2})
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, tags=["sync"])
+    def item():
+        return g.body_params.dict()
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert await response.get_json() == VALID.dict()
+
+    stats = validator.view_executor_stats()["sync"]
+    assert stats["max_workers"] == 2
+    assert stats["completed"] == 1
+    assert stats["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_view_class_executor() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app, tag_view_executors={"sync": 1})
+
+    @tags("sync")
+    class ItemView(MethodView):
+        @validate(body=Item)
+        def post(self):
+            return g.body_params.dict()
+
+    app.add_url_rule("/", view_func=ItemView.as_view("item"))
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert await response.get_json() == VALID.dict()
+    assert validator.view_executor_stats()["sync"]["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_view_executor_max_queue() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, view_max_queue=0)
+    event = threading.Event()
+
+    @app.route("/")
+    @validate(view_executor=1)
+    def slow():
+        event.wait(5)
+        return ""
+
+    test_client = app.test_client()
+
+    async def rejected() -> int:
+        await asyncio.sleep(0.1)
+        response = await test_client.get("/")
+        event.set()
+        return response.status_code
+
+    first, second = await asyncio.gather(test_client.get("/"), rejected())
+    assert first.status_code == 200
+    assert second == 503
+
+
+@pytest.mark.asyncio
+async def test_metrics() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app, metrics=True)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    async def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert response.status_code == 200
+    await test_client.post("/", json=INVALID_DICT)
+
+    snapshot = validator.metrics.snapshot()["item"]
+    assert set(snapshot) == {
+        "parse", "validate", "view", "response_validate", "serialize"}
+    assert snapshot["parse"]["count"] == 2
+    assert snapshot["validate"]["count"] == 2
+    assert snapshot["view"]["buckets"][10.0] == 1
+    assert snapshot["serialize"]["count"] == 1
+
+    response = await test_client.get("/metrics")
+    text = (await response.get_data()).decode()
+    assert response.mimetype == "text/plain"
+    assert 'endpoint="item",phase="view",le="+Inf"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_server_timing() -> None:
+    app = Quart(__name__)
+    SchemaValidator(app, server_timing_token="secret")
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    async def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert "Server-Timing" not in response.headers
+    response = await test_client.post(
+        "/", json=VALID_DICT, headers={"X-Server-Timing": "wrong"})
+    assert "Server-Timing" not in response.headers
+    response = await test_client.post(
+        "/", json=VALID_DICT, headers={"X-Server-Timing": "secret"})
+    timing = response.headers["Server-Timing"]
+    assert "parse;dur=" in timing and "serialize;dur=" in timing
+    assert 'response_bytes;desc="' in timing
+
+
+@pytest.mark.asyncio
+async def test_profiler(tmp_path) -> None:
+    app = Quart(__name__)
+    profiler = Profiler(
+        str(tmp_path), slow_threshold={"item": 0.0}, max_profiles=1)
+    SchemaValidator(app, profiler=profiler)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=Item, responses=Item)
+    async def item():
+        return g.body_params
+
+    test_client = app.test_client()
+    await test_client.post("/", json=VALID_DICT)
+    assert list(tmp_path.iterdir()) == []
+    for _ in range(2):
+        await test_client.post("/", json=VALID_DICT)
+    files = sorted(path.suffix for path in tmp_path.iterdir())
+    assert files == [".json", ".prof"]
+    sidecar, = tmp_path.glob("*.json")
+    metadata = json.loads(sidecar.read_text())
+    assert metadata["endpoint"] == "item"
+    assert metadata["reason"] == "slow"
+    assert metadata["models"] == ["Item", "Item"]
+
+
+@pytest.mark.asyncio
+async def test_deferred_preparation() -> None:
+    app = Quart(__name__)
+    validator = SchemaValidator(app)
+
+    @app.route("/", methods=["POST"])
+    @validate(body=DCItem, query_string=QueryItem)
+    async def item():
+        return ""
+
+    @app.route("/other")
+    @validate(responses=DCItem)
+    async def other():
+        return VALID_DC
+
+    assert validator.pending_preparations(app) == 2
+    async with app.app_context():
+        assert validator.pending_preparations() == 2
+    other_app = Quart("other")
+    assert SchemaValidator(other_app).pending_preparations(other_app) == 0
+    assert not hasattr(item, SCHEMA_REQUEST_ATTRIBUTE)
+    test_client = app.test_client()
+    response = await test_client.post("/", json=VALID_DICT)
+    assert response.status_code == 200
+    assert item._schema_preparation.prepared
+    assert not other._schema_preparation.prepared
+    prepare_all()
+    assert validator.pending_preparations(app) == 0
+    assert other._schema_preparation.prepared
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# about twice the import time of schema_validator.flask or .quart on top
+# of the framework and pydantic, measured at 26ms to 35ms
+BUDGET_US = 60_000
+
+
+def _import_times(code: str) -> Dict[str, int]:
+    """module -> self import time in us."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(self_us)
+    return times
+
+
+def _added_time(framework: str) -> Dict[str, int]:
+    base = _import_times(f"import {framework}, pydantic")
+    times = _import_times(
+        f"import {framework}, pydantic, schema_validator.{framework}")
+    return {name: us for name, us in times.items() if name not in base}
+
+
+@pytest.mark.parametrize(
+    "framework, other", [("flask", "quart"), ("quart", "flask")]
+)
+def test_lazy_imports(framework: str, other: str) -> None:
+    added = _added_time(framework)
+    for lazy in (
+        "schema_validator.core", "schema_validator.command", "humps", other
+    ):
+        assert lazy not in added
+
+
+@pytest.mark.skipif(
+    not os.environ.get("IMPORT_TIME_BUDGET"),
+    reason="wall clock budget, set IMPORT_TIME_BUDGET=1 to run it"
+)
+@pytest.mark.parametrize("framework", ["flask", "quart"])
+def test_import_time(framework: str) -> None:
+    # the best of a few runs, the first ones may pay for cold caches
+    runs = [_added_time(framework) for _ in range(3)]
+    assert min(sum(added.values()) for added in runs) < BUDGET_US